@@ -1,6 +1,8 @@
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.conf import settings
 
+from apps.profiles.services import get_user_for_token
+
 class CustomJWTAuthentication(JWTAuthentication):
     def authenticate(self, request):
         # Try standard header authentication first
@@ -18,3 +20,7 @@ class CustomJWTAuthentication(JWTAuthentication):
 
         validated_token = self.get_validated_token(raw_token)
         return self.get_user(validated_token), validated_token
+
+    def get_user(self, validated_token):
+        # Served from the auth user cache instead of a query per request.
+        return get_user_for_token(validated_token)
@@ -7,6 +7,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
 
 from apps.profiles.services import create_user_and_profile, get_tokens_for_user
+from core.conditional import make_etag, not_modified, set_validators
 from core.responses import error_response, success_response
 from core.serializers import SuccessResponseSerializer
 
@@ -79,8 +80,16 @@ class MeView(APIView):
     @extend_schema(responses={200: SuccessResponseSerializer})
     def get(self, request):
         """Handle GET request for current user info."""
-        return success_response(
-            message="User info retrieved", data=UserSerializer(request.user).data
+        user = request.user
+        # User has no modification timestamp; version on the serialized fields.
+        etag = make_etag(*(getattr(user, name) for name in UserSerializer.Meta.fields))
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
+        return set_validators(
+            success_response(message="User info retrieved", data=UserSerializer(user).data),
+            etag,
         )
 
 
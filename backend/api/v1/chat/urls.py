@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ChatView, AILogViewSet, ConversationViewSet
+from .views import ChatView, AILogViewSet, ConversationViewSet, MetricsView, SyncView
 
 router = DefaultRouter()
 router.register(r'logs', AILogViewSet, basename='ai-logs')
@@ -8,5 +8,7 @@ router.register(r'conversations', ConversationViewSet, basename='conversation')
 
 urlpatterns = [
     path('send/', ChatView.as_view(), name='chat-send'),
+    path('metrics/', MetricsView.as_view(), name='chat-metrics'),
+    path('sync/', SyncView.as_view(), name='chat-sync'),
     path('', include(router.urls)),
 ]
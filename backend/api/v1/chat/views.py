@@ -41,18 +41,77 @@ class ChatView(APIView):
         # Placeholder for user settings - could be fetched from request.user profile
         user_settings = {} 
 
-        ai_response = self.chat_box.process_message(message, user_settings)
+        ai_response = self.chat_box.process_message(message, user_settings, user_id=request.user.pk)
         
         return Response({"response": ai_response}, status=status.HTTP_200_OK)
 
 
+from django.db import transaction
 from rest_framework import permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from apps.chat.models import Conversation
-from apps.chat.serializers import ConversationListSerializer, ConversationDetailSerializer
+from apps.chat.serializers import (
+    ConversationListSerializer,
+    ConversationDetailSerializer,
+    SyncMessageSerializer,
+)
+from apps.chat.services import sync
+from apps.chat.services.conversation_store import (
+    clear_messages,
+    create_conversation,
+    delete_conversation,
+    visible_messages,
+)
+from core import metrics
+from core.conditional import make_etag, not_modified, set_validators
+from core.mixins import ReplicaReadMixin
+from core.pagination import KeysetPagination
+
+
+class MetricsView(APIView):
+    """
+    Process-local LLM usage, latency and health metrics (counters, gauges and histograms).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return success_response(metrics.snapshot(), message="Metrics retrieved")
 
 
-class AILogViewSet(viewsets.ReadOnlyModelViewSet):
+class SyncView(APIView):
+    """
+    Conversations and messages created, updated or deleted since a sync token.
+    Without `since` the full conversation list is returned (`meta.full`);
+    either way `meta.token` is the token for the next call. Clients apply
+    deletions and cleared conversations before upserts.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        parameters=[OpenApiParameter('since', str, description="Token from a previous sync")],
+        summary="Delta sync of conversations and messages",
+    )
+    def get(self, request):
+        try:
+            result = sync.changes_since(request.user, request.query_params.get('since'))
+        except sync.InvalidToken as exc:
+            raise ValidationError({'since': ["Invalid sync token."]}) from exc
+
+        data = {
+            'conversations': ConversationListSerializer(result.conversations, many=True).data,
+            'messages': SyncMessageSerializer(result.messages, many=True).data,
+            'deleted': {
+                'conversations': result.deleted_conversations,
+                'messages': result.deleted_messages,
+            },
+            'cleared': result.cleared_conversations,
+        }
+        meta = {'token': result.token, 'full': result.full, 'has_more': result.has_more}
+        return success_response(data, message="Changes retrieved", meta=meta)
+
+
+class AILogViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows AI logs to be viewed.
     """
@@ -60,19 +119,67 @@ class AILogViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = AILogSerializer
 
 
-class ConversationViewSet(viewsets.ModelViewSet):
+class ConversationViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    """
+    `destroy` and `clear_history` accept `?background=true` to return 202 at
+    once and remove the rows on the background pool.
+    """
     permission_classes = [permissions.IsAuthenticated]
+    replica_actions = ('list', 'retrieve', 'messages')
     
     def get_queryset(self):
-        return Conversation.objects.filter(user=self.request.user)
+        # Inactive conversations are being deleted in the background.
+        queryset = Conversation.objects.filter(user=self.request.user, is_active=True)
+        if self.action == 'list':
+            # The list renders from the last-message snapshot; skip the summary text.
+            queryset = queryset.defer('summary')
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return ConversationDetailSerializer
         return ConversationListSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        conversation = self.get_object()
+        etag = self.conversation_etag(conversation)
+        cached = not_modified(request, etag, conversation.updated_at)
+        if cached is not None:
+            return cached
+        serializer = self.get_serializer(conversation)
+        return set_validators(Response(serializer.data), etag, conversation.updated_at)
+
+    @staticmethod
+    def conversation_etag(conversation, *extra):
+        # Every message write bumps updated_at, message_count and last_message_id;
+        # clears and deletes bump updated_at too, so Last-Modified stays honest.
+        return make_etag(
+            conversation.id,
+            conversation.updated_at.isoformat(),
+            conversation.message_count,
+            conversation.last_message_id,
+            *extra,
+        )
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        sync.record_conversation(serializer.save(user=self.request.user))
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        sync.record_conversation(serializer.save())
+
+    def destroy(self, request, *args, **kwargs):
+        conversation = self.get_object()
+        if self.in_background(request):
+            delete_conversation(conversation, in_background=True)
+            return success_response(message="Deletion scheduled", status=status.HTTP_202_ACCEPTED)
+        delete_conversation(conversation)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @staticmethod
+    def in_background(request):
+        return request.query_params.get('background', '').lower() in ('1', 'true')
 
     @action(detail=False, methods=['post'])
     def new(self, request):
@@ -80,27 +187,42 @@ class ConversationViewSet(viewsets.ModelViewSet):
         Creates a new conversation or returns the most recent empty one.
         """
         # Check for latest conversation
-        last_conv = Conversation.objects.filter(user=request.user).order_by('-created_at').first()
+        last_conv = Conversation.objects.filter(user=request.user, is_active=True).order_by('-created_at').first()
         
         # If it exists and has no messages, reuse it
-        if last_conv and last_conv.messages.count() == 0:
+        if last_conv and last_conv.message_count == 0:
             serializer = ConversationListSerializer(last_conv)
             return success_response(serializer.data, message="Reused empty conversation")
             
         # Otherwise create a new one
-        new_conv = Conversation.objects.create(user=request.user, title="New Chat")
+        new_conv = create_conversation(request.user, "New Chat")
         serializer = ConversationListSerializer(new_conv)
         return success_response(serializer.data, message="Created new conversation")
 
     @action(detail=True, methods=['post'])
     def clear_history(self, request, pk=None):
         conversation = self.get_object()
-        conversation.messages.all().delete()
+        if self.in_background(request):
+            clear_messages(conversation, in_background=True)
+            return success_response(message="History clear scheduled", status=status.HTTP_202_ACCEPTED)
+        clear_messages(conversation)
         return Response({'status': 'history cleared'})
 
     @action(detail=True, methods=['get'])
     def messages(self, request, pk=None):
+        """
+        Newest messages first page; use the `before`/`after` cursors from meta to scroll.
+        """
         conversation = self.get_object()
-        serializer = MessageSerializer(conversation.messages.all(), many=True)
-        return success_response(serializer.data)
+        etag = self.conversation_etag(conversation, request.query_params.urlencode())
+        cached = not_modified(request, etag, conversation.updated_at)
+        if cached is not None:
+            return cached
+
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(visible_messages(conversation), request, view=self)
+        serializer = MessageSerializer(page, many=True)
+        return set_validators(
+            paginator.get_paginated_response(serializer.data), etag, conversation.updated_at
+        )
 
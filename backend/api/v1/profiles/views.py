@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 
 from apps.profiles.services import get_or_create_profile
+from core.conditional import make_etag, not_modified, set_validators
 from core.responses import error_response, success_response
 from core.serializers import SuccessResponseSerializer
 
@@ -20,8 +21,13 @@ class ProfileMeView(APIView):
     def get(self, request):
         """Retrieve the current user's profile."""
         profile = get_or_create_profile(request.user)
+        etag = make_etag(profile.pk, profile.updated_at.isoformat())
+        cached = not_modified(request, etag, profile.updated_at)
+        if cached is not None:
+            return cached
+
         serializer = UserProfileSerializer(profile)
-        return success_response(data=serializer.data)
+        return set_validators(success_response(data=serializer.data), etag, profile.updated_at)
 
     @extend_schema(
         request=UserProfileSerializer, responses={200: SuccessResponseSerializer}
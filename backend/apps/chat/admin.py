@@ -2,14 +2,14 @@
 
 from django.contrib import admin
 
-from .models import AILog, Conversation, Message
+from .models import AILog, ChatChange, ChatSyncCursor, Conversation, Message
 
 
 @admin.register(AILog)
 class AILogAdmin(admin.ModelAdmin):
     """Admin configuration for AILog model."""
 
-    list_display = ("id", "model_name", "tokens_used", "timestamp")
+    list_display = ("id", "model_name", "tokens_used", "latency_ms", "ttft_ms", "timestamp")
     list_filter = ("model_name", "timestamp")
     search_fields = ("input_text", "output_text")
     readonly_fields = ("timestamp",)
@@ -31,3 +31,20 @@ class MessageAdmin(admin.ModelAdmin):
     list_display = ("id", "conversation", "role", "created_at")
     list_filter = ("role", "created_at")
     search_fields = ("content",)
+
+
+@admin.register(ChatChange)
+class ChatChangeAdmin(admin.ModelAdmin):
+    """Admin configuration for ChatChange model."""
+
+    list_display = ("id", "user", "seq", "kind", "op", "conversation_id", "message_id", "created_at")
+    list_filter = ("kind", "op", "created_at")
+    readonly_fields = ("created_at",)
+
+
+@admin.register(ChatSyncCursor)
+class ChatSyncCursorAdmin(admin.ModelAdmin):
+    """Admin configuration for ChatSyncCursor model."""
+
+    list_display = ("user", "seq", "pruned_seq")
+    readonly_fields = ("seq", "pruned_seq")
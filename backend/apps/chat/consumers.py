@@ -1,109 +1,348 @@
-import json
-from channels.generic.websocket import WebsocketConsumer
+import asyncio
+import logging
+from functools import partial
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
 from apps.chat.services.chat_box import ChatBox
-from apps.chat.models import Conversation, Message
+from apps.chat.services.conversation_store import (
+    get_user_conversation,
+    save_assistant_message,
+    save_user_message,
+    start_conversation,
+)
+from apps.chat.services import replay
+from apps.chat.services.admission import Overloaded
+from apps.chat.services.llm_client import StreamInterrupted
+from apps.chat.services.progress import ProgressTracker
+from apps.chat.services.summarizer import schedule_summary
+from core import fastjson
+
+logger = logging.getLogger(__name__)
+
+
+def conversation_group(conversation_id):
+    """Channel layer group shared by every socket open on a conversation."""
+    return f"chat.conversation.{conversation_id}"
+
+
+def optional_int(value):
+    """int(value), keeping None; raises TypeError/ValueError on anything else."""
+    return int(value) if value is not None else None
+
+
+class ChatConsumer(AsyncWebsocketConsumer):
+    """
+    One socket per client, serving any number of the user's conversations.
+
+    Client frames:
+        {"type": "message", "conversation_id": id or null, "ref": "...", "message": "..."}
+        {"type": "subscribe" | "unsubscribe", "conversation_id": id}
+        {"type": "resume", "conversation_id": id, "last_seq": n or null, "epoch": n or null}
+
+    Every server frame carries `conversation_id`; frames answering a message
+    sent without one also echo its `ref`, so the client can match the new
+    conversation to its draft. Messages are queued per conversation: replies
+    in one conversation stay in order while different conversations stream
+    concurrently.
 
-class ChatConsumer(WebsocketConsumer):
-    def connect(self):
+    Every event is sent to this socket first and then fanned out through the
+    channel layer to the other sockets subscribed to the conversation (other
+    tabs, other Daphne nodes). Lasting conversation events carry a
+    per-conversation `seq` and `epoch`; `resume` subscribes and replays the
+    frames after `last_seq`, answering "resumed", or "resync_required" when
+    the gap is gone or the epoch changed and the client has to refetch over
+    REST (see services/replay.py).
+    """
+
+    async def connect(self):
         try:
-            self.accept()
+            await self.accept()
             self.chat_box = ChatBox()
-            
-            # Extract conversation_id from query params
+            self.groups_joined = set()
+            self.queues = {}
+            self.workers = {}
+            # (epoch, highest seq) actually sent on this socket, per conversation
+            self.sent_seq = {}
+            # ref -> conversation created for that draft on this socket
+            self.drafts = {}
+
+            # A conversation_id in the query string is the default for frames
+            # that do not name one, and is subscribed right away
             query_string = self.scope.get('query_string', b'').decode('utf-8')
             params = dict(x.split('=') for x in query_string.split('&') if '=' in x)
-            self.conversation_id = params.get('conversation_id')
-            print(f"DEBUG: WebSocket connected. User: {self.scope['user']}, Conversation ID: {self.conversation_id}")
+            self.default_conversation_id = params.get('conversation_id')
+            logger.debug(
+                f"WebSocket connected: user {self.scope['user'].pk}, conversation {self.default_conversation_id}"
+            )
 
-            self.send(text_data=json.dumps({
+            if self.default_conversation_id:
+                await self.subscribe(self.default_conversation_id)
+
+            await self.send_json({
                 'type': 'system',
                 'message': 'Connected to Sarcastic Therapist.'
-            }))
-        except Exception as e:
-            import traceback
-            print(f"Error in connect: {e}")
-            traceback.print_exc()
-            self.close()
-
-    def disconnect(self, close_code):
-        pass
-
-    def receive(self, text_data):
-        text_data_json = json.loads(text_data)
-        message = text_data_json.get('message')
-
-        if message:
-            # Get user from scope (requires AuthMiddlewareStack)
-            user = self.scope.get('user')
-            print(f"DEBUG: Receive message: {message[:50]}... | User: {user} (Auth: {user.is_authenticated})")
-            
-            # Auto-create conversation if missing
-            conversation = None
-            if self.conversation_id:
+            })
+        except Exception:
+            logger.exception("WebSocket connect failed")
+            await self.close()
+
+    async def disconnect(self, close_code):
+        # Let replies already queued finish and persist, as they did when
+        # frames were handled one at a time
+        for queue in self.queues.values():
+            queue.put_nowait(None)
+        await asyncio.gather(*self.workers.values(), return_exceptions=True)
+        for group in list(self.groups_joined):
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.groups_joined.clear()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        # A bad frame is answered, never raised: that would close the socket
+        # and every conversation multiplexed on it
+        try:
+            frame = fastjson.loads(text_data or bytes_data)
+        except ValueError:
+            frame = None
+        if not isinstance(frame, dict):
+            await self.send_json({'type': 'error', 'message': 'Frames must be JSON objects.'})
+            return
+        kind = frame.get('type', 'message')
+        conversation_id = frame.get('conversation_id', self.default_conversation_id)
+
+        if kind == 'subscribe' and conversation_id:
+            await self.subscribe(conversation_id)
+        elif kind == 'resume' and conversation_id:
+            try:
+                last_seq = optional_int(frame.get('last_seq'))
+                epoch = optional_int(frame.get('epoch'))
+            except (TypeError, ValueError):
+                await self.send_json({
+                    'type': 'error',
+                    'conversation_id': conversation_id,
+                    'message': 'last_seq and epoch must be integers.'
+                })
+                return
+            await self.resume(conversation_id, last_seq, epoch)
+        elif kind == 'unsubscribe' and conversation_id:
+            await self.channel_layer.group_discard(conversation_group(conversation_id), self.channel_name)
+            self.groups_joined.discard(conversation_group(conversation_id))
+        elif kind == 'message' and frame.get('message'):
+            self.enqueue(conversation_id, frame.get('ref'), frame['message'])
+
+    def enqueue(self, conversation_id, ref, message):
+        # Drafts without a conversation are keyed by ref until one is created;
+        # after that, messages still sent without it go to that conversation
+        if not conversation_id and f"new:{ref}" not in self.queues:
+            conversation_id = self.drafts.get(ref)
+        key = str(conversation_id) if conversation_id else f"new:{ref}"
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = asyncio.Queue()
+            self.workers[key] = asyncio.create_task(self.drain(key, queue))
+        queue.put_nowait((conversation_id, ref, message))
+
+    async def drain(self, key, queue):
+        """Handles one conversation's messages in order, then retires."""
+        while True:
+            item = await queue.get()
+            if item is not None:
+                conversation_id, ref, message = item
+                # Only the first message of a draft starts a conversation
+                conversation_id = conversation_id or self.drafts.get(ref)
                 try:
-                    conversation = Conversation.objects.get(id=self.conversation_id, user=user)
-                    print(f"DEBUG: Found existing conversation: {conversation.id}")
-                except Conversation.DoesNotExist:
-                    print(f"DEBUG: Conversation {self.conversation_id} not found for user.")
-                    self.conversation_id = None # Reset if invalid
-
-            if not conversation and user.is_authenticated:
-                conversation = Conversation.objects.create(
-                    user=user,
-                    title=message[:30] + "..." if len(message) > 30 else message
-                )
-                self.conversation_id = str(conversation.id)
-                print(f"DEBUG: Created new conversation: {conversation.id}")
-                
-                # Notify frontend of new conversation
-                self.send(text_data=json.dumps({
-                    'type': 'conversation_started',
-                    'conversation_id': self.conversation_id
-                }))
-
-            # Persist User Message
-            if conversation:
-                # Rename conversation if it's the first message
-                if conversation.messages.count() == 0:
-                    new_title = message[:30] + "..." if len(message) > 30 else message
-                    conversation.title = new_title
-                    conversation.save()
-                    print(f"DEBUG: Renamed convo {conversation.id} to: {new_title}")
-
-                Message.objects.create(
-                    conversation=conversation,
-                    role='user',
-                    content=message
-                )
-                print(f"DEBUG: Saved user message to DB.")
-
-            # Send initial thinking step
-            self.send_step("Reading your complain... I mean, message.")
-            
-            # Process message with callback for more steps
-            response = self.chat_box.process_message(
-                message, 
-                callback=self.send_step
-            )
+                    await self.reply(conversation_id, ref, message)
+                except Exception:
+                    logger.exception(f"Reply failed for conversation {conversation_id}")
+                    await self.send_json({
+                        'type': 'error',
+                        'conversation_id': conversation_id,
+                        'ref': ref,
+                        'message': 'Reply failed, please try again.'
+                    })
+            # No await between the check and the removal, so enqueue() either
+            # sees this worker with its queue or starts a fresh one
+            if item is None or queue.empty():
+                del self.queues[key], self.workers[key]
+                return
+
+    async def reply(self, conversation_id, ref, message):
+        # Get user from scope (requires AuthMiddlewareStack)
+        user = self.scope.get('user')
+        logger.debug(f"Message received for conversation {conversation_id} from user {user.pk}")
+
+        conversation = await self.resolve_conversation(user, conversation_id, ref, message)
+        conversation_id = str(conversation.id) if conversation else None
+        progress = ProgressTracker(callback=partial(self.send_progress, conversation_id, ref))
+
+        # Persist User Message
+        user_message = None
+        if conversation:
+            user_message = await database_sync_to_async(save_user_message)(conversation, message)
+            # The sender already shows its own message
+            await self.broadcast(conversation_id, {
+                'type': 'user_message',
+                'content': message,
+                'conversation_id': conversation_id
+            }, include_self=False)
+
+        # Stream the reply as it is generated
+        chunks = []
+        reply_stream = self.chat_box.astream_message(
+            message,
+            progress=progress,
+            conversation_id=conversation.id if conversation else None,
+            before_id=user_message.id if user_message else None,
+            user_id=user.pk,
+        )
+        try:
+            async for chunk in reply_stream:
+                chunks.append(chunk)
+                await self.broadcast(conversation_id, {
+                    'type': 'delta',
+                    'content': chunk,
+                    'conversation_id': conversation_id,
+                    'ref': ref
+                })
+        except Overloaded as e:
+            # Shed before the LLM was called; the user message stays saved
+            await self.send_json({
+                'type': 'error',
+                'code': e.default_code,
+                'conversation_id': conversation_id,
+                'ref': ref,
+                'message': str(e.detail)
+            })
+            return
+        except StreamInterrupted:
+            # Every tab saw the partial deltas; none of it is saved as a reply
+            await self.broadcast(conversation_id, {
+                'type': 'error',
+                'code': 'incomplete',
+                'conversation_id': conversation_id,
+                'ref': ref,
+                'message': 'The reply was cut off, please try again.'
+            })
+            return
+        response = "".join(chunks)
+
+        # Persist Assistant Message
+        if conversation:
+            await database_sync_to_async(save_assistant_message)(conversation, response)
+            # Compress older turns in the background once enough pile up
+            schedule_summary(conversation.id)
+        await progress.emit("persisted")
+
+        # Send final response
+        await self.broadcast(conversation_id, {
+            'type': 'message',
+            'content': response,
+            'conversation_id': conversation_id,
+            'ref': ref
+        })
+
+    async def resolve_conversation(self, user, conversation_id, ref, message):
+        """Loads the named conversation, auto-creating one if missing."""
+        conversation = None
+        if conversation_id:
+            conversation = await database_sync_to_async(get_user_conversation)(conversation_id, user)
+            if not conversation:
+                logger.debug(f"Conversation {conversation_id} not found for user {user.pk}")
+
+        if not conversation and user.is_authenticated:
+            conversation = await database_sync_to_async(start_conversation)(user, message)
+            logger.debug(f"Created conversation {conversation.id}")
+            self.drafts[ref] = conversation.id
+
+            # Notify frontend of new conversation
+            await self.send_json({
+                'type': 'conversation_started',
+                'conversation_id': str(conversation.id),
+                'ref': ref
+            })
+
+        if conversation:
+            await self.join(conversation.id)
+        return conversation
+
+    async def subscribe(self, conversation_id):
+        """Follows a conversation the user owns, e.g. one open in another tab."""
+        user = self.scope.get('user')
+        if not (user and user.is_authenticated):
+            return
+        conversation = await database_sync_to_async(get_user_conversation)(conversation_id, user)
+        if conversation:
+            await self.join(conversation.id)
+
+    async def resume(self, conversation_id, last_seq, epoch=None):
+        user = self.scope.get('user')
+        conversation = None
+        if user and user.is_authenticated:
+            conversation = await database_sync_to_async(get_user_conversation)(conversation_id, user)
+        if not conversation:
+            await self.send_json({
+                'type': 'error',
+                'conversation_id': conversation_id,
+                'message': 'Conversation not found.'
+            })
+            return
+
+        # Join first: a frame sent meanwhile arrives live as well as in the
+        # replay, and clients drop seqs they have already seen
+        await self.join(conversation.id)
+        current, latest, frames = await replay.frames_since(conversation.id, last_seq, epoch)
+        if frames is None:
+            await self.send_json({
+                'type': 'resync_required', 'conversation_id': conversation_id, 'seq': latest, 'epoch': current
+            })
+            return
+        for frame in frames:
+            await self.send_json(frame)
+        if last_seq is None:
+            # Nothing replayed: frames numbered but still on their way here
+            # must not look already seen, so report only what was sent here
+            sent_epoch, sent = self.sent_seq.get(str(conversation.id), (current, 0))
+            latest = sent if sent_epoch == current else 0
+        await self.send_json({'type': 'resumed', 'conversation_id': conversation_id, 'seq': latest, 'epoch': current})
+
+    async def join(self, conversation_id):
+        group = conversation_group(conversation_id)
+        if group not in self.groups_joined:
+            await self.channel_layer.group_add(group, self.channel_name)
+            self.groups_joined.add(group)
+
+    async def broadcast(self, conversation_id, payload, include_self=True):
+        """Sends `payload` here and to every other socket on the conversation."""
+        if conversation_id:
+            payload = await replay.record(conversation_id, payload)
+        if include_self:
+            await self.send_json(payload)
+        if conversation_id:
+            await self.channel_layer.group_send(conversation_group(conversation_id), {
+                'type': 'chat.event',
+                'origin': self.channel_name,
+                'payload': payload,
+            })
+
+    async def chat_event(self, event):
+        # Group messages also come back to the sender, which already sent them
+        if event['origin'] != self.channel_name:
+            await self.send_json(event['payload'])
+
+    async def send_progress(self, conversation_id, ref, event):
+        await self.broadcast(conversation_id, {
+            'type': 'progress',
+            'conversation_id': conversation_id,
+            'ref': ref,
+            **event
+        })
 
-            # Persist Assistant Message
-            if conversation:
-                Message.objects.create(
-                    conversation=conversation,
-                    role='assistant',
-                    content=response
-                )
-                print(f"DEBUG: Saved assistant message to DB.")
-
-            # Send final response
-            self.send(text_data=json.dumps({
-                'type': 'message',
-                'content': response,
-                'conversation_id': self.conversation_id
-            }))
-
-    def send_step(self, step):
-        self.send(text_data=json.dumps({
-            'type': 'thinking',
-            'step': step
-        }))
+    async def send_json(self, content):
+        await self.send(text_data=fastjson.dumps_str(content))
+        seq = content.get('seq')
+        if seq and content.get('type') not in ('resumed', 'resync_required'):
+            key = str(content['conversation_id'])
+            epoch, sent = self.sent_seq.get(key, (None, 0))
+            # A new epoch restarts the count
+            if content['epoch'] != epoch or seq > sent:
+                self.sent_seq[key] = (content['epoch'], seq)
@@ -1,26 +1,22 @@
 from django.contrib.auth.models import AnonymousUser
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
 from rest_framework_simplejwt.tokens import AccessToken
-from django.contrib.auth import get_user_model
 from django.conf import settings
 from http.cookies import SimpleCookie
+import logging
 
-User = get_user_model()
+from apps.profiles.services import get_user_for_token
+
+logger = logging.getLogger(__name__)
 
 @database_sync_to_async
 def get_user(token_key):
     try:
-        print(f"DEBUG: JWT Middleware received token: {token_key[:20]}...")
-        token = AccessToken(token_key)
-        user_id = token['user_id']
-        user = User.objects.get(id=user_id)
-        print(f"DEBUG: JWT Middleware found user: {user.username} (ID: {user.id})")
-        return user
-    except Exception as e:
-        print(f"DEBUG: JWT Middleware Error: {e}")
-        import traceback
-        traceback.print_exc()
+        return get_user_for_token(AccessToken(token_key))
+    except (TokenError, AuthenticationFailed) as e:
+        logger.info(f"Rejected websocket token: {e}")
         return AnonymousUser()
 
 class JwtAuthMiddleware(BaseMiddleware):
@@ -41,9 +37,10 @@ class JwtAuthMiddleware(BaseMiddleware):
                     cookie_name = settings.SIMPLE_JWT.get('AUTH_COOKIE', 'access_token')
                     if cookie_name in cookies:
                         token = cookies[cookie_name].value
-                        print(f"DEBUG: Found {cookie_name} in cookies: {token[:20]}...")
+                        logger.debug(f"Using websocket token from the {cookie_name} cookie")
                 except Exception as e:
-                    print(f"DEBUG: Error parsing cookies: {e}")
+                    # The error text can quote the cookie header, tokens included
+                    logger.info(f"Unparseable websocket cookie header: {type(e).__name__}")
         
         if token and token != 'null' and token != 'undefined':
             scope['user'] = await get_user(token)
@@ -0,0 +1,124 @@
+"""
+Write-throughput benchmark for the configured database.
+
+Simulates concurrent chats: every writer thread owns a conversation and
+persists user/assistant turns plus an AILog row through the same code paths
+as the consumer, while reader threads keep loading the conversation list.
+Everything created is removed afterwards:
+
+    python manage.py bench_db_writes --chats 16 --turns 50 --readers 4
+"""
+
+import statistics
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+
+from apps.chat.models import AILog, Conversation
+from apps.chat.services.conversation_store import (
+    save_assistant_message,
+    save_user_message,
+    start_conversation,
+)
+
+BENCH_USERNAME = "__bench_db_writes__"
+BENCH_MODEL = "bench"
+
+
+class Command(BaseCommand):
+    help = "Measures chat write throughput under concurrent conversations."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chats", type=int, default=16, help="Concurrent writer threads")
+        parser.add_argument("--turns", type=int, default=50, help="Turns persisted per chat")
+        parser.add_argument("--readers", type=int, default=4, help="Concurrent conversation-list readers")
+
+    def handle(self, *args, **options):
+        db = connection.settings_dict
+        self.stdout.write(f"{db['ENGINE'].rsplit('.', 1)[-1]} {db['NAME']} {db.get('OPTIONS') or ''}")
+
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        try:
+            self.run(user, options["chats"], options["turns"], options["readers"])
+        finally:
+            AILog.objects.filter(model_name=BENCH_MODEL).delete()
+            user.delete()
+
+    def run(self, user, chats, turns, readers):
+        self.latencies, self.errors, self.reads = [], [], 0
+        self.lock = threading.Lock()
+        self.writing = threading.Event()
+        self.writing.set()
+
+        reader_threads = [threading.Thread(target=self.read_list, args=(user,)) for _ in range(readers)]
+        writer_threads = [
+            threading.Thread(target=self.write_chat, args=(user, i, turns)) for i in range(chats)
+        ]
+        for thread in reader_threads:
+            thread.start()
+
+        started = time.perf_counter()
+        for thread in writer_threads:
+            thread.start()
+        for thread in writer_threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.writing.clear()
+        for thread in reader_threads:
+            thread.join()
+
+        self.report(self.latencies, self.errors, self.reads, elapsed, chats)
+
+    def write_chat(self, user, index, turns):
+        """Writer thread: persists `turns` turns to a conversation of its own."""
+        try:
+            conversation = start_conversation(user, f"bench {index}")
+            for turn in range(turns):
+                started = time.perf_counter()
+                try:
+                    save_user_message(conversation, f"user turn {turn}")
+                    save_assistant_message(conversation, f"assistant turn {turn}")
+                    AILog.objects.create(
+                        input_text=f"user turn {turn}",
+                        output_text=f"assistant turn {turn}",
+                        model_name=BENCH_MODEL,
+                    )
+                except OperationalError as e:
+                    with self.lock:
+                        self.errors.append(str(e))
+                    continue
+                with self.lock:
+                    self.latencies.append(time.perf_counter() - started)
+        finally:
+            connections.close_all()
+
+    def read_list(self, user):
+        """Reader thread: loads the conversation list until the writers finish."""
+        try:
+            while self.writing.is_set():
+                list(Conversation.objects.filter(user=user).defer("summary")[:20])
+                with self.lock:
+                    self.reads += 1
+        finally:
+            connections.close_all()
+
+    def report(self, latencies, errors, reads, elapsed, chats):
+        if not latencies:
+            self.stdout.write(self.style.ERROR(f"No turn completed; {len(errors)} errors"))
+            return
+
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f"{chats} chats: {len(latencies)} turns in {elapsed:.2f}s "
+            f"({len(latencies) / elapsed:.0f} turns/s, {reads / elapsed:.0f} list reads/s)"
+        )
+        self.stdout.write(
+            f"turn latency: p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms"
+        )
+        if errors:
+            self.stdout.write(self.style.WARNING(f"{len(errors)} failed turns, e.g. {errors[0]}"))
@@ -0,0 +1,108 @@
+"""
+Query-plan regression check for the chat hot paths.
+
+Runs EXPLAIN for every hot queryset and fails if any of them falls back to a
+full table scan. Works on SQLite and PostgreSQL; run it after reset_db.py:
+
+    python manage.py check_query_plans
+
+Plans that sort in memory instead of reading an index in order are reported
+as warnings; pass --strict to fail on those as well.
+"""
+
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.chat.models import AILog, ChatChange, Conversation, Message
+
+FULL_SCAN_PATTERNS = {
+    # "SCAN t" is a table scan; "SCAN t USING INDEX i" walks an index in order.
+    "sqlite": re.compile(r"\bSCAN (\w+)\b(?! USING (?:COVERING )?INDEX)"),
+    "postgresql": re.compile(r"\bSeq Scan on (\w+)"),
+}
+# An explicit sort means the ordering index is missing; only fatal with --strict.
+SORT_PATTERNS = {
+    "sqlite": re.compile(r"USE TEMP B-TREE FOR (ORDER BY)"),
+    "postgresql": re.compile(r"^\s*(?:->\s*)?(Sort)\b", re.MULTILINE),
+}
+
+
+def hot_querysets(using):
+    """The querysets behind the chat endpoints, consumer and admin filters."""
+    now = timezone.now()
+    conversations = Conversation.objects.using(using)
+    messages = Message.objects.using(using)
+    logs = AILog.objects.using(using)
+
+    return [
+        ("conversation list", conversations.filter(user_id=1).defer("summary")[:10]),
+        ("latest conversation (new)", conversations.filter(user_id=1).order_by("-created_at")[:1]),
+        ("newest messages page", messages.filter(conversation_id=1).order_by("-created_at", "-id")[:51]),
+        (
+            "older messages page",
+            messages.filter(conversation_id=1)
+            .filter(Q(created_at__lt=now) | Q(created_at=now, id__lt=100))
+            .order_by("-created_at", "-id")[:51],
+        ),
+        (
+            "prompt history",
+            messages.filter(conversation_id=1, id__gt=10, id__lt=100).order_by("-created_at", "-id")[:50],
+        ),
+        ("ai log list", logs.all()[:10]),
+        ("ai log by model", logs.filter(model_name="gpt-4o-mini")[:10]),
+        ("ai log by date", logs.filter(timestamp__gte=now - timedelta(days=7))[:10]),
+        ("sync changes", ChatChange.objects.using(using).filter(user_id=1, seq__gt=100).order_by("seq")[:501]),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Fails if a hot chat queryset's EXPLAIN plan uses a full table scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Database alias to explain against")
+        parser.add_argument(
+            "--strict", action="store_true", help="Also fail when a plan sorts instead of reading an index in order"
+        )
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        vendor = connections[using].vendor
+        pattern = FULL_SCAN_PATTERNS.get(vendor)
+        if pattern is None:
+            raise CommandError(f"Query plan checks are not supported on {vendor}.")
+
+        failures = []
+        for name, queryset in hot_querysets(using):
+            plan = self.explain(queryset, using, vendor)
+            scanned = pattern.findall(plan)
+            sorted_ = SORT_PATTERNS[vendor].search(plan)
+            if scanned:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"FAIL {name}: full scan of {', '.join(scanned)}"))
+            elif sorted_ and options["strict"]:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"FAIL {name}: sorts instead of using an index"))
+            elif sorted_:
+                self.stdout.write(self.style.WARNING(f"warn {name}: sorts instead of using an index"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"ok   {name}"))
+
+            if scanned or sorted_ or options["verbosity"] > 1:
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot queryset(s) are not served by an index: {', '.join(failures)}")
+
+    @staticmethod
+    def explain(queryset, using, vendor):
+        with transaction.atomic(using=using):
+            if vendor == "postgresql":
+                # Tiny dev tables make seq scans "cheapest"; only accept them if no index applies.
+                with connections[using].cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+            return queryset.explain()
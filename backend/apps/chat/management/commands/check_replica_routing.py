@@ -0,0 +1,93 @@
+"""
+Replica routing check for the chat read endpoints.
+
+Needs a replica that does not replicate, so routing is observable; locally
+two SQLite files do the job:
+
+    DATABASE_URL=sqlite:///db.sqlite3 \\
+    DATABASE_REPLICA_URL=sqlite:///replica.sqlite3 \\
+    python manage.py check_replica_routing
+
+Creates a throwaway user and conversation on the primary and checks that a
+pinned user reads its own write, an unpinned user reads from the replica,
+and writes made through the API only reach the primary. Cleans up after
+itself on both databases.
+"""
+
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.test import Client
+
+from apps.chat.models import Conversation
+from apps.chat.services.conversation_store import create_conversation
+from apps.profiles.services import get_tokens_for_user
+from core.db_router import PIN_CACHE_PREFIX, REPLICA_ALIAS, replica_configured
+
+LIST_URL = "/api/v1/chat/conversations/"
+
+
+class Command(BaseCommand):
+    help = "Checks read-replica routing and read-your-writes end to end."
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError("No replica configured; set DATABASE_REPLICA_URL.")
+        if settings.DATABASES["default"]["NAME"] == settings.DATABASES[REPLICA_ALIAS]["NAME"]:
+            raise CommandError("Primary and replica are the same database; routing is not observable.")
+
+        user = User.objects.create_user(username=f"replica-check-{uuid.uuid4().hex[:8]}")
+        client = Client(HTTP_HOST="localhost")
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {get_tokens_for_user(user)['access']}"}
+        self.failures = []
+        try:
+            conversation = create_conversation(user, "written to the primary")
+            self.expect(
+                "pinned user reads its own write",
+                conversation.id in self.listed(client, auth),
+            )
+
+            self.unpin(user)
+            self.expect(
+                "unpinned reads go to the replica",
+                conversation.id not in self.listed(client, auth),
+            )
+
+            # Stand in for replication and read the row back from the replica.
+            user.save(using=REPLICA_ALIAS)
+            conversation.save(using=REPLICA_ALIAS)
+            self.expect("replica rows are served", conversation.id in self.listed(client, auth))
+
+            response = client.post(LIST_URL, {"title": "created through the API"}, "application/json", **auth)
+            created = response.json()["id"]
+            self.expect(
+                "API writes reach only the primary",
+                Conversation.objects.using("default").filter(id=created).exists()
+                and not Conversation.objects.using(REPLICA_ALIAS).filter(id=created).exists(),
+            )
+            self.expect("writes pin the user to the primary", created in self.listed(client, auth))
+        finally:
+            for alias in ("default", REPLICA_ALIAS):
+                User.objects.using(alias).filter(username=user.username).delete()
+            self.unpin(user)
+
+        if self.failures:
+            raise CommandError(f"{len(self.failures)} replica routing check(s) failed.")
+
+    def listed(self, client, auth):
+        response = client.get(LIST_URL, {"page_size": 100}, **auth)
+        return {row["id"] for row in response.json()["data"]}
+
+    def expect(self, name, passed):
+        if passed:
+            self.stdout.write(self.style.SUCCESS(f"ok   {name}"))
+        else:
+            self.failures.append(name)
+            self.stdout.write(self.style.ERROR(f"FAIL {name}"))
+
+    @staticmethod
+    def unpin(user):
+        caches[settings.REPLICA_PIN_CACHE_ALIAS].delete(f"{PIN_CACHE_PREFIX}:{user.pk}")
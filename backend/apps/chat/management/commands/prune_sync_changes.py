@@ -0,0 +1,32 @@
+"""
+Prunes the delta-sync change feed. Run it periodically (e.g. daily cron):
+
+    python manage.py prune_sync_changes --days 30
+
+Clients holding a token from before the pruned range get a full snapshot on
+their next sync.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.chat.services.sync import prune_changes
+
+
+class Command(BaseCommand):
+    help = "Deletes sync feed entries older than the retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.CHAT_SYNC_RETENTION_DAYS,
+            help="Keep this many days of changes",
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_changes(timezone.now() - timedelta(days=options["days"]))
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} sync changes."))
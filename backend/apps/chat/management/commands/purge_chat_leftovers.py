@@ -0,0 +1,21 @@
+"""
+Finishes conversation deletes and history clears that were cut short, e.g.
+by a restart while the background pool was still purging. Run it after
+deploys or periodically:
+
+    python manage.py purge_chat_leftovers
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.chat.services.conversation_store import purge_leftovers
+
+
+class Command(BaseCommand):
+    help = "Purges messages left behind by interrupted deletes and clears."
+
+    def handle(self, *args, **options):
+        conversations, clears = purge_leftovers()
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {conversations} deleted conversations and finished {clears} clears."
+        ))
@@ -9,10 +9,18 @@ class AILog(models.Model):
     output_text = models.TextField(help_text="AI response")
     model_name = models.CharField(max_length=50, help_text="Model used, e.g. gpt-4o-mini")
     tokens_used = models.IntegerField(null=True, blank=True)
+    prompt_tokens = models.IntegerField(null=True, blank=True)
+    completion_tokens = models.IntegerField(null=True, blank=True)
+    latency_ms = models.FloatField(null=True, blank=True, help_text="Wall-clock time of the LLM call")
+    ttft_ms = models.FloatField(null=True, blank=True, help_text="Time to first streamed token")
     timestamp = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=["-timestamp"], name="chat_ailog_timestamp_idx"),
+            models.Index(fields=["model_name", "-timestamp"], name="chat_ailog_model_ts_idx"),
+        ]
 
     def __str__(self):
         return f"Log {self.id} - {self.timestamp}"
@@ -24,9 +32,28 @@ class Conversation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # Rolling summary of older turns, see apps.chat.services.summarizer
+    summary = models.TextField(blank=True)
+    summarized_until_id = models.BigIntegerField(
+        null=True, blank=True, help_text="Last message folded into the summary"
+    )
+    # Denormalized snapshot of the latest message, kept in sync by conversation_store
+    message_count = models.PositiveIntegerField(default=0)
+    last_message_id = models.BigIntegerField(null=True, blank=True)
+    last_message_role = models.CharField(max_length=50, blank=True)
+    last_message_preview = models.CharField(max_length=255, blank=True)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    # Messages up to this id were cleared and are being deleted in batches
+    cleared_until_id = models.BigIntegerField(null=True, blank=True)
+    # Bumped by every clear, so work started before one (e.g. a summary) can't land after it
+    clear_generation = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ["-updated_at"]
+        indexes = [
+            models.Index(fields=["user", "-updated_at"], name="chat_conv_user_updated_idx"),
+            models.Index(fields=["user", "-created_at"], name="chat_conv_user_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title or 'Untitled'}"
@@ -41,6 +68,63 @@ class Message(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # Keyset pagination and history loads walk (conversation, created_at, id)
+            models.Index(fields=["conversation", "created_at", "id"], name="chat_msg_conv_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.role} in {self.conversation_id}: {self.content[:50]}..."
+
+
+class ChatSyncCursor(models.Model):
+    """
+    Per-user position of the change feed. Writers take its row lock to
+    number their changes, so a user's `seq` values commit in order, unlike
+    auto-increment ids.
+    """
+
+    user = models.OneToOneField("auth.User", on_delete=models.CASCADE, primary_key=True, related_name="+")
+    seq = models.BigIntegerField(default=0)
+    # Changes up to here were pruned; tokens below it get a full snapshot
+    pruned_seq = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id} @ {self.seq}"
+
+
+class ChatChange(models.Model):
+    """
+    Append-only change feed for conversations and messages. The per-user
+    `seq` is the sequence that delta sync tokens point into.
+    """
+
+    CONVERSATION = "conversation"
+    MESSAGE = "message"
+    KIND_CHOICES = [(CONVERSATION, "Conversation"), (MESSAGE, "Message")]
+
+    UPSERT = "upsert"
+    DELETE = "delete"
+    CLEAR = "clear"  # All messages of the conversation were removed
+    OP_CHOICES = [(UPSERT, "Upsert"), (DELETE, "Delete"), (CLEAR, "Clear")]
+
+    user = models.ForeignKey("auth.User", on_delete=models.CASCADE, related_name="chat_changes")
+    seq = models.BigIntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    op = models.CharField(max_length=10, choices=OP_CHOICES)
+    # Plain ids rather than foreign keys so delete records outlive their rows
+    conversation_id = models.BigIntegerField()
+    message_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["user", "seq"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "seq"], name="chat_change_user_seq_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["created_at"], name="chat_change_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.op} {self.kind} {self.message_id or self.conversation_id}"
@@ -15,23 +15,36 @@ class MessageSerializer(serializers.ModelSerializer):
         fields = ['id', 'role', 'content', 'created_at']
 
 
+class SyncMessageSerializer(MessageSerializer):
+    # Sync batches span conversations, so each message names its own.
+
+    class Meta(MessageSerializer.Meta):
+        fields = ['conversation', *MessageSerializer.Meta.fields]
+
+
 class ConversationListSerializer(serializers.ModelSerializer):
     last_message = serializers.SerializerMethodField()
 
     class Meta:
         model = Conversation
-        fields = ['id', 'title', 'created_at', 'updated_at', 'is_active', 'last_message']
+        fields = ['id', 'title', 'created_at', 'updated_at', 'is_active', 'message_count', 'last_message']
+        # Inactive conversations are being deleted; only delete_conversation sets it.
+        read_only_fields = ['is_active']
 
     def get_last_message(self, obj):
-        last_msg = obj.messages.order_by('-created_at').first()
-        if last_msg:
-            return MessageSerializer(last_msg).data
-        return None
-
-
-class ConversationDetailSerializer(serializers.ModelSerializer):
-    messages = MessageSerializer(many=True, read_only=True)
-
-    class Meta:
-        model = Conversation
-        fields = ['id', 'title', 'created_at', 'updated_at', 'is_active', 'messages']
+        # Rendered from the denormalized snapshot; no per-row query.
+        if not obj.last_message_id:
+            return None
+        return {
+            'id': obj.last_message_id,
+            'role': obj.last_message_role,
+            'content': obj.last_message_preview,
+            'created_at': serializers.DateTimeField().to_representation(obj.last_message_at),
+        }
+
+
+class ConversationDetailSerializer(ConversationListSerializer):
+    # Messages are not embedded; clients page through them with the `messages` action.
+
+    class Meta(ConversationListSerializer.Meta):
+        fields = ConversationListSerializer.Meta.fields
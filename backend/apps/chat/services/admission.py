@@ -0,0 +1,219 @@
+"""
+Admission control for upstream LLM calls.
+
+At most LLM_MAX_CONCURRENCY calls run at once in this process, and at most
+LLM_MAX_CONCURRENCY_PER_USER of them for any one user. Calls beyond that wait
+in a queue served round-robin across users, so one user sending a burst of
+messages cannot starve everyone else. Once LLM_QUEUE_MAX_DEPTH calls are
+waiting, or the user already has LLM_QUEUE_MAX_PER_USER waiting, new calls
+are refused straight away with Overloaded instead of timing out in the queue.
+
+Limits are per process: size them as the provider's rate limit divided by
+the number of server processes.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from core import metrics
+
+# Fallback interval at which a queued async call re-checks the queue.
+POSITION_POLL_INTERVAL = 0.5
+
+admissions = metrics.counter("llm_admissions_total", "LLM calls by admission outcome")
+queue_wait = metrics.histogram("llm_queue_wait_ms", "Time LLM calls waited for a slot")
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "The therapist is fully booked right now. Please try again in a minute."
+    default_code = "overloaded"
+
+
+class _Waiter:
+    """A queued call. `wake` is called when it is granted or moves up."""
+
+    def __init__(self, key, wake=None):
+        self.key = key
+        self.granted = threading.Event()
+        self.wake = wake
+
+    def grant(self):
+        self.granted.set()
+        if self.wake:
+            self.wake()
+
+
+class AdmissionController:
+    """
+    Counting limiter with a global cap, per-key caps and a fair queue.
+
+    Keys are user ids (None for anonymous callers, who share one key). Both
+    blocking callers (`admit`) and coroutines (`aadmit`) are supported and
+    share the same slots.
+    """
+
+    def __init__(self, max_concurrency=None, max_per_user=None, max_queue=None, max_queue_per_user=None):
+        self.max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY
+        self.max_per_user = max_per_user or settings.LLM_MAX_CONCURRENCY_PER_USER
+        self.max_queue = max_queue if max_queue is not None else settings.LLM_QUEUE_MAX_DEPTH
+        self.max_queue_per_user = (
+            max_queue_per_user if max_queue_per_user is not None else settings.LLM_QUEUE_MAX_PER_USER
+        )
+        self._lock = threading.Lock()
+        self._active = 0
+        self._active_by_key = {}
+        # key -> waiters in arrival order; dict order is the round-robin order
+        self._queues = OrderedDict()
+        self._waiting = 0
+
+    @contextmanager
+    def admit(self, key):
+        """Holds a slot for `key` for the duration of the block, waiting if needed."""
+        started = time.perf_counter()
+        waiter = self._enqueue(key)
+        if waiter:
+            waiter.granted.wait()
+        self._record(waiter, started)
+        try:
+            yield
+        finally:
+            self.release(key)
+
+    @asynccontextmanager
+    async def aadmit(self, key, on_queued=None):
+        """
+        Async counterpart of admit(). While queued, `on_queued(position)` is
+        awaited with the 1-based queue position whenever it changes.
+        """
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        waiter = self._enqueue(key, wake=lambda: loop.call_soon_threadsafe(wakeup.set))
+        if waiter:
+            try:
+                reported = None
+                while True:
+                    wakeup.clear()
+                    if waiter.granted.is_set():
+                        break
+                    position = self.position(waiter)
+                    if on_queued and position != reported:
+                        reported = position
+                        await on_queued(position)
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), POSITION_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                # Cancelled (e.g. the socket closed) while queued
+                self._abandon(waiter)
+                raise
+        self._record(waiter, started)
+        try:
+            yield
+        finally:
+            self.release(key)
+
+    def release(self, key):
+        with self._lock:
+            self._active -= 1
+            remaining = self._active_by_key[key] - 1
+            if remaining:
+                self._active_by_key[key] = remaining
+            else:
+                del self._active_by_key[key]
+            self._dispatch()
+
+    def position(self, waiter):
+        """How many calls are served before `waiter` plus one; 0 once admitted."""
+        with self._lock:
+            if waiter.granted.is_set():
+                return 0
+            # Round-robin: keys ahead in the rotation get one more turn than
+            # keys behind before this waiter's round comes up.
+            index = self._queues[waiter.key].index(waiter)
+            ahead, behind = index, False
+            for key, queue in self._queues.items():
+                if key == waiter.key:
+                    behind = True
+                    continue
+                ahead += min(len(queue), index if behind else index + 1)
+            return ahead + 1
+
+    def _enqueue(self, key, wake=None):
+        """Takes a slot and returns None, or returns a queued waiter."""
+        with self._lock:
+            # With a free global slot, everyone queued is held by their own
+            # per-user cap, so admitting `key` directly skips nobody.
+            if key not in self._queues and self._has_room(key):
+                self._start(key)
+                return None
+            if self._waiting >= self.max_queue or len(self._queues.get(key, ())) >= self.max_queue_per_user:
+                admissions.inc(outcome="shed")
+                raise Overloaded()
+            waiter = _Waiter(key, wake)
+            self._queues.setdefault(key, deque()).append(waiter)
+            self._waiting += 1
+            return waiter
+
+    def _abandon(self, waiter):
+        with self._lock:
+            granted = waiter.granted.is_set()
+            if not granted:
+                queue = self._queues[waiter.key]
+                queue.remove(waiter)
+                if not queue:
+                    del self._queues[waiter.key]
+                self._waiting -= 1
+        if granted:
+            self.release(waiter.key)
+
+    def _dispatch(self):
+        # Called with the lock held after a slot frees up.
+        # Keys can be None (anonymous), so no sentinel lookups here.
+        while self._active < self.max_concurrency:
+            for key in self._queues:
+                if self._has_room(key):
+                    break
+            else:
+                break
+            queue = self._queues.pop(key)
+            waiter = queue.popleft()
+            if queue:
+                self._queues[key] = queue  # to the back of the rotation
+            self._waiting -= 1
+            self._start(key)
+            waiter.grant()
+        # Everyone still queued moved up
+        for queue in self._queues.values():
+            for waiter in queue:
+                if waiter.wake:
+                    waiter.wake()
+
+    def _has_room(self, key):
+        return self._active < self.max_concurrency and self._active_by_key.get(key, 0) < self.max_per_user
+
+    def _start(self, key):
+        self._active += 1
+        self._active_by_key[key] = self._active_by_key.get(key, 0) + 1
+
+    @staticmethod
+    def _record(waiter, started):
+        admissions.inc(outcome="queued" if waiter else "immediate")
+        if waiter:
+            queue_wait.observe((time.perf_counter() - started) * 1000)
+
+
+@lru_cache(maxsize=1)
+def get_admission_controller():
+    """The process-wide controller shared by the REST and websocket paths."""
+    return AdmissionController()
@@ -0,0 +1,75 @@
+"""Write-behind persistence of AILog records."""
+
+import atexit
+import logging
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from ..models import AILog
+
+logger = logging.getLogger(__name__)
+
+
+class AILogWriter:
+    """
+    Buffers AILog rows in memory and writes them with bulk_create once
+    `batch_size` rows are queued or `flush_interval` seconds have passed.
+
+    Rows are stamped when they are written, so `timestamp` can trail the
+    actual reply by up to `flush_interval`.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None):
+        self.batch_size = batch_size or settings.AILOG_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.AILOG_FLUSH_INTERVAL
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def enqueue(self, **fields):
+        """Queues one AILog row; never touches the database on the caller's thread."""
+        with self._lock:
+            self._buffer.append(AILog(**fields))
+            full = len(self._buffer) >= self.batch_size
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="ailog-writer", daemon=True
+                )
+                self._thread.start()
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """Writes everything queued so far. Returns the number of rows written."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+
+        try:
+            AILog.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception:
+            logger.exception(f"Dropped {len(batch)} AILog rows after a failed flush")
+            return 0
+        return len(batch)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+@lru_cache(maxsize=1)
+def get_ai_log_writer():
+    """The process-wide writer; whatever is still queued is flushed at exit."""
+    writer = AILogWriter()
+    atexit.register(writer.flush)
+    return writer
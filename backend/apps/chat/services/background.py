@@ -0,0 +1,43 @@
+"""Shared worker pool for chat work that must stay off the request path."""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+
+
+def submit(fn, *args, **kwargs):
+    """
+    Runs `fn(*args, **kwargs)` on the background pool and returns its Future.
+    Failures are logged, and the worker's DB connection is released afterwards.
+    """
+    return _get_executor().submit(_run, fn, args, kwargs)
+
+
+def _get_executor():
+    global _executor  # pylint: disable=global-statement
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.CHAT_BACKGROUND_WORKERS,
+                    thread_name_prefix="chat-background",
+                )
+    return _executor
+
+
+def _run(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception(f"Background task {fn.__name__} failed")
+        return None
+    finally:
+        close_old_connections()
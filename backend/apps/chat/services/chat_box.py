@@ -1,50 +1,126 @@
-from .llm_client import LLMClient
+from asgiref.sync import sync_to_async
+
+from .admission import get_admission_controller
+from .ai_log_writer import get_ai_log_writer
+from .context_builder import ContextBuilder
+from .llm_client import CallStats, LLMClient
+from .progress import ProgressTracker
 from .prompt_manager import PromptManager
-from ..models import AILog
+from .semantic_cache import get_semantic_cache
+
 
 class ChatBox:
     def __init__(self):
         self.llm_client = LLMClient()
         self.prompt_manager = PromptManager()
+        self.context_builder = ContextBuilder()
         # Placeholder for tools
         self.tools = []
 
-    def process_message(self, user_message, user_settings=None, callback=None):
-        # 1. Manage Context (placeholder)
-        if callback:
-            import time
-            import random
-            steps = [
-                "Analyzing your tone...",
-                "Consulting the archives of sarcasm...",
-                "Pretending to care...",
-                "Formulating a witty retort...",
-                "Judging silently..."
-            ]
-            for _ in range(2):
-                callback(random.choice(steps))
-                time.sleep(0.8)
-        context = None
+    def process_message(
+        self, user_message, user_settings=None, conversation_id=None, before_id=None, user_id=None
+    ):
+        # 1. Construct Prompt
+        messages = self.build_messages(user_message, user_settings, conversation_id, before_id)
+
+        # 2. Reuse the reply to a near-identical opener, or call the LLM
+        stats = CallStats()
+        response = self.semantic_lookup(user_message, messages)
+        if response is None:
+            with get_admission_controller().admit(user_id):
+                response = self.llm_client.get_response(messages, stats=stats)
+            self.semantic_remember(user_message, messages, response, stats)
+
+        # Log the interaction (written behind, off the reply path)
+        get_ai_log_writer().enqueue(**self.log_fields(user_message, messages, response, stats))
+
+        # 3. Check for Tools (placeholder logic)
+        # if tool_trigger in response: execute_tool()
+
+        return response
+
+    async def astream_message(
+        self, user_message, user_settings=None, progress=None, conversation_id=None, before_id=None, user_id=None
+    ):
+        """
+        Yields the reply chunk by chunk and logs the full interaction once the
+        stream is exhausted. Pipeline stages are reported through `progress`,
+        including the queue position while waiting for an LLM slot. Raises
+        admission.Overloaded when the queue is full.
+        """
+        progress = progress or ProgressTracker()
+
+        context = await sync_to_async(self.load_context)(user_settings, conversation_id, before_id)
+        await progress.emit("context_loaded")
+
+        messages = self.prompt_manager.construct_messages(user_message, context)
+        await progress.emit("prompt_built")
+
+        chunks = []
+        stats = CallStats()
+        cached = await sync_to_async(self.semantic_lookup)(user_message, messages)
+        if cached is not None:
+            await progress.emit("first_token", cache="semantic")
+            chunks.append(cached)
+            yield cached
+        else:
+            admission = get_admission_controller().aadmit(
+                user_id, on_queued=lambda position: progress.emit("queued", position=position)
+            )
+            async with admission:
+                await progress.emit("request_sent")
+                async for chunk in self.llm_client.astream(messages, stats=stats):
+                    if not chunks:
+                        await progress.emit("first_token")
+                    chunks.append(chunk)
+                    yield chunk
+
+        response = "".join(chunks)
+        if cached is None:
+            self.semantic_remember(user_message, messages, response, stats)
+        get_ai_log_writer().enqueue(**self.log_fields(user_message, messages, response, stats))
+
+    def build_messages(self, user_message, user_settings=None, conversation_id=None, before_id=None):
+        context = self.load_context(user_settings, conversation_id, before_id)
+        return self.prompt_manager.construct_messages(user_message, context)
+
+    def load_context(self, user_settings=None, conversation_id=None, before_id=None):
         if user_settings:
             # logic to use user settings
             pass
+        return self.context_builder.build(conversation_id, before_id)
 
-        # 2. Construct Prompt
-        messages = self.prompt_manager.construct_messages(user_message, context)
+    def semantic_lookup(self, user_message, messages):
+        """Cached reply for a conversation opener similar to `user_message`, if any."""
+        cache = get_semantic_cache()
+        if cache is None or not self.is_opener(messages):
+            return None
+        return cache.lookup(user_message)
 
-        # 3. Call LLM
-        response = self.llm_client.get_response(messages)
+    def semantic_remember(self, user_message, messages, response, stats):
+        # Fallbacks and streams cut off after a partial reply are not worth reusing
+        if stats.outcome != "ok":
+            return
+        cache = get_semantic_cache()
+        if cache is not None and self.is_opener(messages):
+            cache.add(user_message, response)
 
-        # Log the interaction
-        # Log the interaction
-        AILog.objects.create(
-            input_text=user_message,
-            context=[{"role": m["role"], "content": m["content"]} for m in messages], # Store the full message context
-            output_text=response,
-            model_name=self.llm_client.chat.model_name
-        )
+    @staticmethod
+    def is_opener(messages):
+        # Only the system prompt and the user message: no history or summary
+        # that would make a reused reply out of place.
+        return len(messages) == 2
 
-        # 4. Check for Tools (placeholder logic)
-        # if tool_trigger in response: execute_tool()
-
-        return response
+    def log_fields(self, user_message, messages, response, stats):
+        return {
+            "input_text": user_message,
+            # Store the full message context
+            "context": [{"role": m["role"], "content": m["content"]} for m in messages],
+            "output_text": response,
+            "model_name": stats.model_name or self.llm_client.chat.model_name,
+            "tokens_used": stats.total_tokens,
+            "prompt_tokens": stats.prompt_tokens,
+            "completion_tokens": stats.completion_tokens,
+            "latency_ms": stats.latency_ms,
+            "ttft_ms": stats.ttft_ms,
+        }
@@ -0,0 +1,65 @@
+"""
+Process-wide registry of shared LLM chat clients.
+
+Chat models are cached per (model, settings) and all of them share one
+keep-alive HTTP connection pool per transport (sync and async), so the TLS
+handshake and client setup are paid once per process instead of once per
+socket or request.
+
+Timeouts are set on the pools and on the client; the SDK's own retries are
+off because LLMClient retries transient failures itself.
+"""
+
+import threading
+
+import httpx
+from django.conf import settings
+from langchain_openai import ChatOpenAI
+
+_lock = threading.Lock()
+_chat_models = {}
+_http_clients = {}
+
+
+def get_chat_model(model=None, **params):
+    """
+    Returns the shared ChatOpenAI instance for `model` and sampling `params`,
+    creating it on first use. Safe to call from threads and coroutines.
+    """
+    model = model or settings.LLM_MODEL
+    key = (model, tuple(sorted(params.items())))
+
+    chat = _chat_models.get(key)
+    if chat is None:
+        with _lock:
+            chat = _chat_models.get(key)
+            if chat is None:
+                chat = _build_chat_model(model, params)
+                _chat_models[key] = chat
+    return chat
+
+
+def _build_chat_model(model, params):
+    # Called with _lock held.
+    timeout = httpx.Timeout(settings.LLM_READ_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT)
+    if not _http_clients:
+        limits = httpx.Limits(
+            max_connections=settings.LLM_POOL_SIZE,
+            max_keepalive_connections=settings.LLM_POOL_SIZE,
+            keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+        )
+        _http_clients["sync"] = httpx.Client(limits=limits, timeout=timeout)
+        _http_clients["async"] = httpx.AsyncClient(limits=limits, timeout=timeout)
+
+    return ChatOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        model=model,
+        http_client=_http_clients["sync"],
+        http_async_client=_http_clients["async"],
+        # The SDK would otherwise override the pool timeout with its 600s default
+        timeout=timeout,
+        max_retries=0,
+        # Report token usage on the final chunk of streamed completions
+        stream_usage=True,
+        **params,
+    )
@@ -0,0 +1,96 @@
+"""Builds the conversation history sent to the LLM alongside each prompt."""
+
+import logging
+from functools import lru_cache
+
+import tiktoken
+from django.conf import settings
+
+from ..models import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+# Approximate per-message framing overhead of the chat completion format.
+MESSAGE_TOKEN_OVERHEAD = 4
+
+
+@lru_cache(maxsize=8)
+def get_tokenizer(model):
+    """
+    Returns the cached tiktoken encoding for `model`, or None when the
+    encoding cannot be loaded (e.g. offline without a local BPE cache).
+    """
+    try:
+        encoding_name = tiktoken.encoding_name_for_model(model)
+    except KeyError:
+        encoding_name = "o200k_base"
+
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.warning(f"Tokenizer unavailable for {model}, estimating tokens: {e}")
+        return None
+
+
+def count_tokens(text, model=None):
+    """Counts tokens in `text`, falling back to a ~4 chars/token estimate."""
+    encoding = get_tokenizer(model or settings.LLM_MODEL)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+class ContextBuilder:
+    """
+    Loads the conversation summary plus the most recent unsummarized turns,
+    trimming turns oldest first so the total never exceeds the token budget.
+    """
+
+    def __init__(self, token_budget=None, max_messages=None):
+        self.token_budget = token_budget or settings.CHAT_CONTEXT_TOKEN_BUDGET
+        self.max_messages = max_messages or settings.CHAT_CONTEXT_MAX_MESSAGES
+
+    def build(self, conversation_id, before_id=None):
+        """
+        Returns {"summary": str, "history": [chat messages, chronological]}.
+        `before_id` excludes that message and anything newer.
+        """
+        conversation = (
+            Conversation.objects.filter(id=conversation_id)
+            .values("summary", "summarized_until_id", "cleared_until_id")
+            .first()
+            if conversation_id
+            else None
+        )
+        if not conversation:
+            return {"summary": "", "history": []}
+
+        rows = Message.objects.filter(conversation_id=conversation_id)
+        # Skip what the summary already covers and cleared messages awaiting deletion
+        after = max(conversation["summarized_until_id"] or 0, conversation["cleared_until_id"] or 0)
+        if after:
+            rows = rows.filter(id__gt=after)
+        if before_id:
+            rows = rows.filter(id__lt=before_id)
+        rows = rows.order_by("-created_at", "-id").values("role", "content")
+
+        summary = conversation["summary"]
+        budget = self.token_budget - (count_tokens(summary) if summary else 0)
+        return {
+            "summary": summary,
+            "history": self.trim(list(rows[: self.max_messages]), budget),
+        }
+
+    @staticmethod
+    def trim(newest_first, budget):
+        """Keeps the newest messages that fit the budget, oldest first."""
+        history, used = [], 0
+        for row in newest_first:
+            cost = count_tokens(row["content"]) + MESSAGE_TOKEN_OVERHEAD
+            if used + cost > budget:
+                break
+            history.append({"role": row["role"], "content": row["content"]})
+            used += cost
+
+        history.reverse()
+        return history
@@ -0,0 +1,207 @@
+"""Persistence helpers for conversations and their messages."""
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from . import background, sync
+from ..models import ChatChange, Conversation, Message
+
+PREVIEW_LENGTH = 255
+
+
+def make_title(message):
+    """Derive a conversation title from the first user message."""
+    return message[:30] + "..." if len(message) > 30 else message
+
+
+def get_user_conversation(conversation_id, user):
+    """
+    Returns the conversation if it belongs to the user, otherwise None.
+    """
+    try:
+        return Conversation.objects.get(id=conversation_id, user=user, is_active=True)
+    except (Conversation.DoesNotExist, ValueError):
+        return None
+
+
+def start_conversation(user, message):
+    """
+    Creates a new conversation titled after the opening message.
+    """
+    return create_conversation(user, make_title(message))
+
+
+def create_conversation(user, title):
+    """
+    Creates a conversation and records it in the sync feed.
+    """
+    with transaction.atomic():
+        conversation = Conversation.objects.create(user=user, title=title)
+        sync.record_conversation(conversation)
+    return conversation
+
+
+def save_user_message(conversation, content):
+    """
+    Persists a user message, renaming the conversation on its first message.
+    """
+    with transaction.atomic():
+        Conversation.objects.filter(id=conversation.id, message_count=0).update(
+            title=make_title(content)
+        )
+        return append_message(conversation, "user", content)
+
+
+def save_assistant_message(conversation, content):
+    """
+    Persists an assistant reply.
+    """
+    with transaction.atomic():
+        return append_message(conversation, "assistant", content)
+
+
+def append_message(conversation, role, content):
+    """
+    Creates the message and refreshes the conversation's last-message
+    snapshot and message count in the same transaction.
+    """
+    message = Message.objects.create(conversation=conversation, role=role, content=content)
+    Conversation.objects.filter(id=conversation.id).update(
+        message_count=F("message_count") + 1,
+        last_message_id=message.id,
+        last_message_role=role,
+        last_message_preview=content[:PREVIEW_LENGTH],
+        last_message_at=message.created_at,
+        updated_at=message.created_at,
+    )
+    sync.record_changes(
+        conversation.user_id,
+        conversation.id,
+        (ChatChange.MESSAGE, ChatChange.UPSERT, message.id),
+        (ChatChange.CONVERSATION, ChatChange.UPSERT, None),
+    )
+    return message
+
+
+def visible_messages(conversation):
+    """
+    The conversation's messages, minus cleared ones still awaiting deletion.
+    """
+    rows = conversation.messages.all()
+    if conversation.cleared_until_id:
+        rows = rows.filter(id__gt=conversation.cleared_until_id)
+    return rows
+
+
+def clear_messages(conversation, in_background=False):
+    """
+    Clears the conversation's history. The messages are hidden and the
+    snapshot is reset at once; the rows themselves are deleted in bounded
+    batches, on the background pool when `in_background` is set. Messages
+    sent after the clear are kept.
+    """
+    with transaction.atomic():
+        last_id = Message.objects.filter(conversation_id=conversation.id).aggregate(last=Max("id"))["last"]
+        reset_message_snapshot(conversation, cleared_until_id=last_id)
+    conversation.cleared_until_id = last_id
+    if last_id is None:
+        return
+
+    if in_background:
+        background.submit(_purge_cleared_messages, conversation.id, last_id)
+    else:
+        _purge_cleared_messages(conversation.id, last_id)
+
+
+def delete_conversation(conversation, in_background=False):
+    """
+    Deletes the conversation and its messages in bounded batches. It is
+    hidden (is_active=False) and reported deleted to sync clients at once,
+    so `in_background` can return before the rows are gone.
+    """
+    with transaction.atomic():
+        Conversation.objects.filter(id=conversation.id).update(is_active=False, updated_at=timezone.now())
+        sync.record_conversation(conversation, ChatChange.DELETE)
+
+    if in_background:
+        background.submit(_purge_conversation, conversation.id)
+    else:
+        _purge_conversation(conversation.id)
+
+
+def delete_messages_in_batches(conversation_id, up_to_id=None, batch_size=None):
+    """
+    Deletes the conversation's messages (up to `up_to_id`) in DELETEs of at
+    most `batch_size` rows, each in its own transaction, so locks are held
+    briefly. Returns the rows deleted.
+    """
+    batch_size = batch_size or settings.CHAT_DELETE_BATCH_SIZE
+    using = router.db_for_write(Message)
+    rows = Message.objects.using(using).filter(conversation_id=conversation_id)
+    if up_to_id is not None:
+        rows = rows.filter(id__lte=up_to_id)
+
+    deleted = 0
+    while True:
+        ids = list(rows.order_by("id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Message.objects.using(using).filter(id__in=ids).delete()[0]
+
+
+def _purge_cleared_messages(conversation_id, up_to_id):
+    delete_messages_in_batches(conversation_id, up_to_id)
+    # Drop the watermark unless a later clear moved it.
+    Conversation.objects.filter(id=conversation_id, cleared_until_id=up_to_id).update(cleared_until_id=None)
+
+
+def _purge_conversation(conversation_id):
+    delete_messages_in_batches(conversation_id)
+    # Only stragglers sent while the batches ran are left for the cascade.
+    Conversation.objects.filter(id=conversation_id).delete()
+
+
+def purge_leftovers():
+    """
+    Finishes purges a restart interrupted: deleted conversations still on
+    disk and cleared messages still behind their watermark. Purging is
+    idempotent, so running this alongside a live purge is harmless.
+    Returns (conversations purged, clears finished).
+    """
+    deleted = list(Conversation.objects.filter(is_active=False).values_list("id", flat=True))
+    for conversation_id in deleted:
+        _purge_conversation(conversation_id)
+
+    cleared = list(
+        Conversation.objects.filter(is_active=True, cleared_until_id__isnull=False)
+        .values_list("id", "cleared_until_id")
+    )
+    for conversation_id, up_to_id in cleared:
+        _purge_cleared_messages(conversation_id, up_to_id)
+    return len(deleted), len(cleared)
+
+
+def reset_message_snapshot(conversation, cleared_until_id=None):
+    """
+    Clears the last-message snapshot after a conversation's messages are removed.
+    """
+    sync.record_changes(
+        conversation.user_id,
+        conversation.id,
+        (ChatChange.CONVERSATION, ChatChange.CLEAR, None),
+        (ChatChange.CONVERSATION, ChatChange.UPSERT, None),
+    )
+    Conversation.objects.filter(id=conversation.id).update(
+        message_count=0,
+        last_message_id=None,
+        last_message_role="",
+        last_message_preview="",
+        last_message_at=None,
+        summary="",
+        summarized_until_id=None,
+        cleared_until_id=cleared_until_id,
+        clear_generation=F("clear_generation") + 1,
+        updated_at=timezone.now(),
+    )
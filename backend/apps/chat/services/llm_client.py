@@ -1,37 +1,270 @@
+from dataclasses import dataclass
+import asyncio
+import time
+
+import httpx
+import openai
 from django.conf import settings
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 import logging
 
+from core import metrics
+from core.resilience import CLOSED, CircuitOpen, backoff_delay, circuit_breaker
+
+from .client_pool import get_chat_model
+from .response_cache import get_response_cache, make_key
+
 logger = logging.getLogger(__name__)
 
-class LLMClient:
-    def __init__(self):
-        self.api_key = getattr(settings, 'OPENAI_API_KEY', None)
-        self.chat = ChatOpenAI(
-            api_key=self.api_key,
-            model="gpt-4o-mini"
+FALLBACK_RESPONSE = "Analysis complete: I am currently unable to provide therapy. Please check my connection."
+
+llm_calls = metrics.counter("llm_calls_total", "LLM calls by model and outcome")
+llm_tokens = metrics.counter("llm_tokens_total", "Tokens used by model and kind")
+llm_latency = metrics.histogram("llm_latency_ms", "Wall-clock latency of LLM calls")
+llm_ttft = metrics.histogram("llm_ttft_ms", "Time to first streamed token")
+llm_retries = metrics.counter("llm_retries_total", "LLM call attempts retried after a transient failure")
+
+# Failures worth retrying: the provider may well answer the same request next time
+TRANSIENT_ERRORS = (
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.ConflictError,
+    httpx.TransportError,  # stream cut off mid-read
+)
+
+
+class StreamInterrupted(Exception):
+    """A streamed completion failed after part of it was already yielded."""
+
+
+def is_transient(error):
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+@dataclass
+class CallStats:
+    """Usage and timing of one LLM call, filled in by LLMClient."""
+
+    model_name: str = None
+    prompt_tokens: int = None
+    completion_tokens: int = None
+    latency_ms: float = None
+    ttft_ms: float = None
+    outcome: str = None
+
+    @property
+    def total_tokens(self):
+        if self.prompt_tokens is None and self.completion_tokens is None:
+            return None
+        return (self.prompt_tokens or 0) + (self.completion_tokens or 0)
+
+
+class _Attempts:
+    """
+    Retry bookkeeping for one LLM call: checks the model's circuit breaker
+    before each attempt and, after a failure, backs off or gives up.
+    """
+
+    def __init__(self, chat, give_up):
+        self.chat = chat
+        self.give_up = give_up  # called with the outcome once retries run out
+        self.breaker = circuit_breaker(
+            f"llm:{chat.model_name}", settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET
         )
+        self.attempt = 0
+
+    def start(self):
+        self.breaker.before_call()
+
+    def succeeded(self):
+        self.breaker.record_success()
+
+    def failed(self, error, retryable=True):
+        """
+        Records a failed attempt and returns the backoff before the next one,
+        or None once the call has given up.
+        """
+        delay = self._delay(error, retryable)
+        if delay is None:
+            logger.error(f"Error calling OpenAI via LangChain: {error}")
+            self.give_up("circuit_open" if isinstance(error, CircuitOpen) else "error")
+        else:
+            self.attempt += 1
+        return delay
+
+    def _delay(self, error, retryable):
+        if isinstance(error, CircuitOpen):
+            return None
+        if not is_transient(error):
+            # The provider answered (e.g. 400/401); it is up, the request is not retryable
+            self.breaker.record_success()
+            return None
+        self.breaker.record_failure()
+        if not retryable or self.attempt >= settings.LLM_MAX_RETRIES or self.breaker.state != CLOSED:
+            return None
+        llm_retries.inc(model=self.chat.model_name, error=type(error).__name__)
+        return backoff_delay(self.attempt, settings.LLM_RETRY_BACKOFF, settings.LLM_RETRY_BACKOFF_MAX)
+
+
+class LLMClient:
+    """
+    Calls the chat model with timeouts (see client_pool), retries transient
+    failures with jittered exponential backoff and stops calling a model
+    whose circuit breaker is open. Any failure that survives that ends in
+    FALLBACK_RESPONSE.
+    """
+
+    def __init__(self, model=None):
+        # Shared per process; constructing an LLMClient is cheap.
+        self.chat = get_chat_model(model)
+
+    def get_response(self, messages, model=None, stats=None):
+        chat = self._chat_for(model)
+        stats = self._start_stats(chat, stats)
+        cache, key = self._cache_lookup_key(chat, messages)
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            self._record(stats, "cache_hit")
+            return cached
+
+        started = time.perf_counter()
+        langchain_messages = self._to_langchain(messages)
+        attempts = self._attempts(chat, stats, started)
+        while True:
+            try:
+                attempts.start()
+                response = chat.invoke(langchain_messages)
+                attempts.succeeded()
+                break
+            except Exception as e:
+                delay = attempts.failed(e)
+                if delay is None:
+                    return FALLBACK_RESPONSE
+            time.sleep(delay)
+
+        self._add_usage(stats, response)
+        self._record(stats, "ok", started)
+        if cache:
+            cache.set(key, response.content)
+        return response.content
+
+    async def astream(self, messages, model=None, stats=None):
+        """
+        Yields the completion as text chunks as they arrive from the provider.
+        Transient failures are retried only until the first chunk is out;
+        after that a retry would repeat text the caller already has, so the
+        failure raises StreamInterrupted. Falls back to the canned response
+        if the call fails before any output.
+        A cache hit is yielded as a single chunk without calling the provider.
+        """
+        chat = self._chat_for(model)
+        stats = self._start_stats(chat, stats)
+        cache, key = self._cache_lookup_key(chat, messages)
+        cached = await cache.aget(key) if cache else None
+        if cached is not None:
+            self._record(stats, "cache_hit")
+            yield cached
+            return
+
+        chunks = []
+        started = time.perf_counter()
+        langchain_messages = self._to_langchain(messages)
+        attempts = self._attempts(chat, stats, started)
+        while True:
+            try:
+                attempts.start()
+                async for text in self._stream_attempt(chat, langchain_messages, stats, started, chunks):
+                    yield text
+                attempts.succeeded()
+                break
+            except Exception as e:
+                delay = attempts.failed(e, retryable=not chunks)
+                if delay is None:
+                    if chunks:
+                        raise StreamInterrupted(f"Stream from {chat.model_name} cut off") from e
+                    yield FALLBACK_RESPONSE
+                    return
+            await asyncio.sleep(delay)
+
+        self._record(stats, "ok", started)
+        if cache and chunks:
+            await cache.aset(key, "".join(chunks))
+
+    async def _stream_attempt(self, chat, langchain_messages, stats, started, chunks):
+        """One streaming attempt; yields text and collects it into `chunks`."""
+        async for chunk in chat.astream(langchain_messages):
+            self._add_usage(stats, chunk)
+            if chunk.content:
+                if not chunks:
+                    stats.ttft_ms = self._elapsed_ms(started)
+                chunks.append(chunk.content)
+                yield chunk.content
+
+    def _attempts(self, chat, stats, started):
+        return _Attempts(chat, give_up=lambda outcome: self._record(stats, outcome, started))
+
+    @staticmethod
+    def _cache_lookup_key(chat, messages):
+        cache = get_response_cache()
+        if cache is None:
+            return None, None
+        params = {
+            "temperature": chat.temperature,
+            "top_p": chat.top_p,
+            "max_tokens": chat.max_tokens,
+        }
+        return cache, make_key(chat.model_name, messages, params)
+
+    @staticmethod
+    def _start_stats(chat, stats):
+        stats = stats if stats is not None else CallStats()
+        stats.model_name = chat.model_name
+        return stats
+
+    @staticmethod
+    def _add_usage(stats, message):
+        # Streams report usage on the final chunk only (stream_usage=True).
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            stats.prompt_tokens = (stats.prompt_tokens or 0) + usage.get("input_tokens", 0)
+            stats.completion_tokens = (stats.completion_tokens or 0) + usage.get("output_tokens", 0)
+
+    def _record(self, stats, outcome, started=None):
+        stats.outcome = outcome
+        llm_calls.inc(model=stats.model_name, outcome=outcome)
+        if started is None:
+            return
+
+        stats.latency_ms = self._elapsed_ms(started)
+        llm_latency.observe(stats.latency_ms, model=stats.model_name)
+        if stats.ttft_ms is not None:
+            llm_ttft.observe(stats.ttft_ms, model=stats.model_name)
+        if stats.prompt_tokens is not None:
+            llm_tokens.inc(stats.prompt_tokens, model=stats.model_name, kind="prompt")
+        if stats.completion_tokens is not None:
+            llm_tokens.inc(stats.completion_tokens, model=stats.model_name, kind="completion")
+
+    @staticmethod
+    def _elapsed_ms(started):
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    def _chat_for(self, model):
+        # Never mutate the shared client; look up the one for `model` instead.
+        if model is None or model == self.chat.model_name:
+            return self.chat
+        return get_chat_model(model)
 
-    def get_response(self, messages, model="gpt-4o-mini"):
-        try:
-            # Update model if different from default
-            if model != self.chat.model_name:
-                self.chat.model_name = model
-
-            langchain_messages = []
-            for msg in messages:
-                role = msg.get("role")
-                content = msg.get("content")
-                if role == "system":
-                    langchain_messages.append(SystemMessage(content=content))
-                elif role == "user":
-                    langchain_messages.append(HumanMessage(content=content))
-                elif role == "assistant":
-                    langchain_messages.append(AIMessage(content=content))
-            
-            response = self.chat.invoke(langchain_messages)
-            return response.content
-        except Exception as e:
-            logger.error(f"Error calling OpenAI via LangChain: {e}")
-            return "Analysis complete: I am currently unable to provide therapy. Please check my connection."
+    @staticmethod
+    def _to_langchain(messages):
+        langchain_messages = []
+        for msg in messages:
+            role = msg.get("role")
+            content = msg.get("content")
+            if role == "system":
+                langchain_messages.append(SystemMessage(content=content))
+            elif role == "user":
+                langchain_messages.append(HumanMessage(content=content))
+            elif role == "assistant":
+                langchain_messages.append(AIMessage(content=content))
+        return langchain_messages
@@ -0,0 +1,42 @@
+"""Real-time progress reporting for the chat reply pipeline."""
+
+import time
+
+STAGE_LABELS = {
+    "context_loaded": "Reading your complaint... I mean, your history.",
+    "prompt_built": "Formulating a witty retort...",
+    "queued": "In the waiting room. The magazines are from 2009.",
+    "request_sent": "Consulting the archives of sarcasm...",
+    "first_token": "Typing with visible reluctance...",
+    "persisted": "Filing this under 'concerning'.",
+}
+
+
+class ProgressTracker:
+    """
+    Emits a progress event for each pipeline stage as it finishes.
+
+    Every event carries the time since the tracker started (`elapsed_ms`)
+    and the time spent in that stage alone (`stage_ms`).
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.started_at = time.perf_counter()
+        self.last_at = self.started_at
+
+    async def emit(self, stage, **extra):
+        """Records `stage` as finished and forwards the event to the callback."""
+        now = time.perf_counter()
+        event = {
+            "stage": stage,
+            "label": STAGE_LABELS.get(stage, stage),
+            "elapsed_ms": round((now - self.started_at) * 1000, 1),
+            "stage_ms": round((now - self.last_at) * 1000, 1),
+            **extra,
+        }
+        self.last_at = now
+
+        if self.callback:
+            await self.callback(event)
+        return event
@@ -6,10 +6,16 @@ class PromptManager:
         messages = [
             {"role": "system", "content": self.system_prompt}
         ]
-        
-        # Add context if available (placeholder for now)
+
         if context:
-            messages.append({"role": "system", "content": f"Context: {context}"})
-            
+            # Rolling summary of turns that no longer fit in the history
+            if context.get("summary"):
+                messages.append({
+                    "role": "system",
+                    "content": f"Summary of the conversation so far: {context['summary']}"
+                })
+            # Latest turns, already trimmed to the token budget
+            messages.extend(context.get("history", []))
+
         messages.append({"role": "user", "content": user_message})
         return messages
@@ -0,0 +1,101 @@
+"""
+Sequence numbers and replay buffer for conversation frames.
+
+Every lasting frame broadcast on a conversation (a message, a user message,
+an error) is stamped with the conversation's next `seq` and `epoch`, and the
+last CHAT_REPLAY_SIZE of them are kept as one list in the
+CHAT_REPLAY_CACHE_ALIAS cache for CHAT_REPLAY_TTL seconds. Streamed deltas
+and progress frames are transient: they go out unnumbered and are never
+buffered, since the final message frame carries the whole reply.
+
+A reconnecting client sends the last seq and epoch it saw and gets only the
+frames after them. When those are no longer buffered (too far behind,
+expired, or the counter was reset) it is told to refetch over REST instead.
+The epoch changes whenever the counter is recreated (restart, eviction,
+flush), so clients can tell a reset from frames they have already seen.
+The cache must be shared between processes when more than one Daphne node
+serves the same conversations.
+"""
+
+import secrets
+
+from django.conf import settings
+from django.core.cache import caches
+
+KEY_PREFIX = "chat-replay"
+TRANSIENT_FRAMES = ("delta", "progress")
+
+# The counter holds epoch << EPOCH_SHIFT | seq, so one atomic incr yields both
+EPOCH_SHIFT = 32
+SEQ_MASK = (1 << EPOCH_SHIFT) - 1
+
+
+def _cache():
+    return caches[settings.CHAT_REPLAY_CACHE_ALIAS]
+
+
+def _counter_key(conversation_id):
+    return f"{KEY_PREFIX}:{conversation_id}:seq"
+
+
+def _buffer_key(conversation_id):
+    return f"{KEY_PREFIX}:{conversation_id}:frames"
+
+
+def _split(counter):
+    return counter >> EPOCH_SHIFT, counter & SEQ_MASK
+
+
+async def record(conversation_id, frame):
+    """Returns `frame` stamped with the conversation's next seq, buffered for replay."""
+    if frame.get("type") in TRANSIENT_FRAMES:
+        return frame
+
+    cache = _cache()
+    counter = _counter_key(conversation_id)
+    try:
+        value = await cache.aincr(counter)
+    except ValueError:
+        # A fresh counter starts a fresh epoch; only one writer's add wins
+        await cache.aadd(counter, (secrets.randbelow(1 << 30) + 1) << EPOCH_SHIFT, timeout=None)
+        value = await cache.aincr(counter)
+    epoch, seq = _split(value)
+    frame = {**frame, "seq": seq, "epoch": epoch}
+
+    # Read-modify-write: a frame lost to a concurrent append leaves a gap,
+    # which frames_since() answers with a resync
+    key = _buffer_key(conversation_id)
+    frames = [f for f in await cache.aget(key, []) if f["epoch"] == epoch]
+    frames.append(frame)
+    frames.sort(key=lambda f: f["seq"])
+    await cache.aset(key, frames[-settings.CHAT_REPLAY_SIZE:], settings.CHAT_REPLAY_TTL)
+    return frame
+
+
+async def latest_seq(conversation_id):
+    """Returns (epoch, seq) of the last numbered frame; (None, 0) before any."""
+    value = await _cache().aget(_counter_key(conversation_id))
+    return _split(value) if value is not None else (None, 0)
+
+
+async def frames_since(conversation_id, last_seq, epoch=None):
+    """
+    Returns (epoch, latest seq, frames after `last_seq` in order). The frames
+    are None when the gap can no longer be replayed, including when `epoch`
+    is given and the counter has since been reset.
+    """
+    current, latest = await latest_seq(conversation_id)
+    if last_seq is None:
+        return current, latest, []
+    if epoch is not None and epoch != current:
+        return current, latest, None
+    if last_seq > latest:
+        return current, latest, None
+    if last_seq == latest:
+        return current, latest, []
+
+    frames = [f for f in await _cache().aget(_buffer_key(conversation_id), []) if f["epoch"] == current]
+    missed = [f for f in frames if f["seq"] > last_seq]
+    if [f["seq"] for f in missed] != list(range(last_seq + 1, latest + 1)):
+        return current, latest, None
+    return current, latest, missed
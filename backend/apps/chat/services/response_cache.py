@@ -0,0 +1,115 @@
+"""
+Exact-match cache for LLM completions.
+
+Entries are keyed on a hash of the model, the normalized message list and
+the sampling parameters. Lookups hit a per-process LRU first and then, if
+LLM_CACHE_SHARED_ALIAS names a Django cache, a shared tier that other
+workers can fill.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core import metrics
+
+SHARED_KEY_PREFIX = "llm-response:"
+
+cache_lookups = metrics.counter("llm_cache_lookups_total", "LLM cache lookups by cache and result")
+
+
+def make_key(model, messages, params=None):
+    """Stable hash of the request; whitespace differences do not change it."""
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": m["role"], "content": " ".join(m["content"].split())}
+            for m in messages
+        ],
+        "params": params or {},
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe LRU with TTL, backed by an optional shared Django cache."""
+
+    def __init__(self, max_entries=None, ttl=None, shared_alias=None):
+        self.max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+        self.ttl = ttl or settings.LLM_CACHE_TTL
+        self.shared = caches[shared_alias] if shared_alias else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self._get_local(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(SHARED_KEY_PREFIX + key)
+            self._record_shared(key, value)
+        if value is None:
+            self._count_miss()
+        return value
+
+    async def aget(self, key):
+        value = self._get_local(key)
+        if value is None and self.shared is not None:
+            value = await self.shared.aget(SHARED_KEY_PREFIX + key)
+            self._record_shared(key, value)
+        if value is None:
+            self._count_miss()
+        return value
+
+    def set(self, key, value):
+        self._set_local(key, value)
+        if self.shared is not None:
+            self.shared.set(SHARED_KEY_PREFIX + key, value, timeout=self.ttl)
+
+    async def aset(self, key, value):
+        self._set_local(key, value)
+        if self.shared is not None:
+            await self.shared.aset(SHARED_KEY_PREFIX + key, value, timeout=self.ttl)
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        cache_lookups.inc(cache="response", result="local_hit")
+        return value
+
+    def _set_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _record_shared(self, key, value):
+        if value is None:
+            return
+        cache_lookups.inc(cache="response", result="shared_hit")
+        self._set_local(key, value)
+
+    @staticmethod
+    def _count_miss():
+        cache_lookups.inc(cache="response", result="miss")
+
+
+@lru_cache(maxsize=1)
+def get_response_cache():
+    """The process-wide cache, or None when LLM_CACHE_ENABLED is off."""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    return ResponseCache(shared_alias=settings.LLM_CACHE_SHARED_ALIAS)
@@ -0,0 +1,132 @@
+"""
+Semantic response cache for conversation openers.
+
+User messages are embedded locally and compared by cosine similarity against
+a bounded NumPy index of earlier openers, so near-duplicates such as
+"I feel sad today" and "feeling sad today" reuse a stored reply.
+"""
+
+import logging
+import threading
+import zlib
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .llm_client import FALLBACK_RESPONSE
+from .response_cache import cache_lookups
+from ..models import AILog
+
+logger = logging.getLogger(__name__)
+
+
+def hashed_ngram_embedding(text, dim=None):
+    """
+    Offline embedding: signed feature hashing of word character trigrams,
+    L2-normalized so a dot product is the cosine similarity.
+    """
+    dim = dim or settings.SEMANTIC_CACHE_DIM
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in text.lower().split():
+        padded = f"#{word.strip('.,!?;:')}#"
+        for i in range(max(len(padded) - 2, 1)):
+            bucket = zlib.crc32(padded[i : i + 3].encode("utf-8"))
+            vector[bucket % dim] += 1.0 if bucket & 0x80000000 else -1.0
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticIndex:
+    """Fixed-capacity vector index; evicts the least recently used entry when full."""
+
+    def __init__(self, dim, capacity):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.replies = [None] * capacity
+        self.last_used = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+        self._tick = 0
+        self._lock = threading.Lock()
+
+    def search(self, vector):
+        """Returns (similarity, reply) of the closest entry, or (0.0, None)."""
+        with self._lock:
+            if not self.size:
+                return 0.0, None
+            scores = self.vectors[: self.size] @ vector
+            best = int(np.argmax(scores))
+            self._tick += 1
+            self.last_used[best] = self._tick
+            return float(scores[best]), self.replies[best]
+
+    def add(self, vector, reply):
+        with self._lock:
+            if self.size < len(self.replies):
+                slot = self.size
+                self.size += 1
+            else:
+                slot = int(np.argmin(self.last_used))
+            self._tick += 1
+            self.vectors[slot] = vector
+            self.replies[slot] = reply
+            self.last_used[slot] = self._tick
+
+
+class SemanticCache:
+    """Looks up replies for openers whose embedding clears the similarity threshold."""
+
+    def __init__(self, embedder=None, threshold=None, capacity=None):
+        self.embed = embedder or import_string(settings.SEMANTIC_CACHE_EMBEDDER)
+        self.threshold = threshold or settings.SEMANTIC_CACHE_THRESHOLD
+        self.capacity = capacity or settings.SEMANTIC_CACHE_CAPACITY
+        self.index = None
+        self._warm_lock = threading.Lock()
+
+    def lookup(self, text):
+        """Returns the cached reply for a similar opener, or None."""
+        index = self.get_index()
+        score, reply = index.search(self.embed(text))
+        if reply is not None and score >= self.threshold:
+            cache_lookups.inc(cache="semantic", result="hit")
+            return reply
+        cache_lookups.inc(cache="semantic", result="miss")
+        return None
+
+    def add(self, text, reply):
+        if reply == FALLBACK_RESPONSE:
+            return
+        self.get_index().add(self.embed(text), reply)
+
+    def get_index(self):
+        if self.index is None:
+            with self._warm_lock:
+                if self.index is None:
+                    self.index = self.warm()
+        return self.index
+
+    def warm(self):
+        """Seeds the index from the most recent AILog openers (system + user prompts only)."""
+        index = None
+        rows = AILog.objects.exclude(output_text=FALLBACK_RESPONSE).values_list(
+            "input_text", "context", "output_text"
+        )[: self.capacity]
+        # Oldest first, so the newest logs end up most recently used.
+        for input_text, context, output_text in reversed(list(rows)):
+            if len(context) > 2:
+                continue
+            vector = self.embed(input_text)
+            index = index or SemanticIndex(len(vector), self.capacity)
+            index.add(vector, output_text)
+
+        logger.info(f"Semantic cache warmed with {index.size if index else 0} openers")
+        return index or SemanticIndex(len(self.embed("")), self.capacity)
+
+
+@lru_cache(maxsize=1)
+def get_semantic_cache():
+    """The process-wide semantic cache, or None when SEMANTIC_CACHE_ENABLED is off."""
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    return SemanticCache()
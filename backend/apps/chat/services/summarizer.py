@@ -0,0 +1,135 @@
+"""Rolling summarization of older conversation turns."""
+
+import logging
+import threading
+
+from django.conf import settings
+
+from . import background
+from .admission import Overloaded, get_admission_controller
+from .context_builder import count_tokens
+from .llm_client import FALLBACK_RESPONSE, LLMClient
+from ..models import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a therapy chat. Merge the new turns into "
+    "the existing summary. Keep the user's concerns, facts about their life and "
+    "any advice already given. Reply with the updated summary only, under 200 words."
+)
+
+# Admission key shared by all summaries: they queue as one more "user", so
+# they take at most LLM_MAX_CONCURRENCY_PER_USER slots and never jump ahead
+ADMISSION_KEY = "summarizer"
+
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+def schedule_summary(conversation_id):
+    """
+    Queues a summary refresh for the conversation on the background pool.
+    At most one refresh per conversation runs at a time.
+    """
+    with _in_flight_lock:
+        if conversation_id in _in_flight:
+            return
+        _in_flight.add(conversation_id)
+    background.submit(_summarize, conversation_id)
+
+
+def _summarize(conversation_id):
+    try:
+        summarizer = ConversationSummarizer()
+        # A backlog is folded a bounded batch at a time
+        while summarizer.summarize(conversation_id):
+            pass
+    finally:
+        with _in_flight_lock:
+            _in_flight.discard(conversation_id)
+
+
+class ConversationSummarizer:
+    """
+    Folds turns older than the last `keep_turns` into `Conversation.summary`,
+    but only once at least `threshold` such turns have accumulated. Each call
+    folds at most `max_turns` turns and `token_budget` transcript tokens,
+    oldest first.
+    """
+
+    def __init__(self, keep_turns=None, threshold=None, max_turns=None, token_budget=None):
+        self.keep_turns = keep_turns or settings.CHAT_SUMMARY_KEEP_TURNS
+        self.threshold = threshold or settings.CHAT_SUMMARY_THRESHOLD
+        self.max_turns = max_turns or settings.CHAT_SUMMARY_MAX_TURNS
+        self.token_budget = token_budget or settings.CHAT_SUMMARY_TOKEN_BUDGET
+        self.llm_client = LLMClient()
+
+    def summarize(self, conversation_id):
+        """Updates the summary if enough new turns are pending. Returns True if it did."""
+        conversation = Conversation.objects.filter(id=conversation_id).first()
+        if not conversation:
+            return False
+
+        turns = self.pending_turns(conversation)
+        if len(turns) < self.threshold:
+            return False
+
+        turns = self.within_budget(turns)
+        try:
+            with get_admission_controller().admit(ADMISSION_KEY):
+                summary = self.llm_client.get_response(self.build_prompt(conversation.summary, turns))
+        except Overloaded:
+            # Replies come first; the next reply schedules another attempt
+            logger.info(f"Summary of conversation {conversation_id} deferred, LLM queue full")
+            return False
+        if summary == FALLBACK_RESPONSE:
+            return False
+
+        # Only advance from the pointer we read, so a concurrent refresh can't
+        # regress it, and drop the summary if history was cleared meanwhile.
+        updated = Conversation.objects.filter(
+            id=conversation.id,
+            summarized_until_id=conversation.summarized_until_id,
+            clear_generation=conversation.clear_generation,
+        ).update(summary=summary, summarized_until_id=turns[-1]["id"])
+        return bool(updated)
+
+    def pending_turns(self, conversation):
+        """
+        The oldest unsummarized turns, at most `max_turns`, excluding the most
+        recent `keep_turns`.
+        """
+        rows = Message.objects.filter(conversation_id=conversation.id)
+        after = max(conversation.summarized_until_id or 0, conversation.cleared_until_id or 0)
+        if after:
+            rows = rows.filter(id__gt=after)
+        rows = list(
+            rows.order_by("created_at", "id").values("id", "role", "content")[: self.max_turns + self.keep_turns]
+        )
+        return rows[: max(len(rows) - self.keep_turns, 0)]
+
+    def within_budget(self, turns):
+        """The oldest turns that fit `token_budget`; always at least one, cut to fit."""
+        kept, used = [], 0
+        for turn in turns:
+            tokens = count_tokens(turn["content"])
+            if kept and used + tokens > self.token_budget:
+                break
+            if tokens > self.token_budget:
+                # ~4 chars per token; one huge message must not sink every pass
+                turn = {**turn, "content": turn["content"][: self.token_budget * 4]}
+            kept.append(turn)
+            used += tokens
+        return kept
+
+    @staticmethod
+    def build_prompt(summary, turns):
+        transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+        return [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {
+                "role": "user",
+                "content": f"Existing summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}",
+            },
+        ]
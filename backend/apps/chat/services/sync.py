@@ -0,0 +1,193 @@
+"""
+Change feed behind the delta sync endpoint.
+
+Every write to a conversation or one of its messages appends a ChatChange row
+in the same transaction, numbered from the user's ChatSyncCursor. The cursor
+row stays locked until that transaction commits, so a user's changes become
+visible in `seq` order and a client never skips one that commits late.
+
+A sync token is an opaque encoding of the last seq a client has seen; reading
+from it coalesces the newer changes into the current state of the objects
+they touched, so a reconnecting client only transfers what actually changed.
+Changes older than CHAT_SYNC_RETENTION_DAYS are pruned (prune_sync_changes);
+tokens from before the pruned range get a full snapshot instead.
+"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+
+from core.db_router import pin_to_primary
+
+from ..models import ChatChange, ChatSyncCursor, Conversation, Message
+
+MAX_CHANGES = 500
+TOKEN_PREFIX = "v2:"
+# Tokens that counted global change ids; they are answered with a full snapshot
+STALE_TOKEN_PREFIXES = ("v1:",)
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+@dataclass
+class SyncResult:
+    token: str
+    full: bool = False
+    has_more: bool = False
+    conversations: list = field(default_factory=list)
+    messages: list = field(default_factory=list)
+    deleted_conversations: list = field(default_factory=list)
+    deleted_messages: list = field(default_factory=list)
+    cleared_conversations: list = field(default_factory=list)
+
+
+def record_changes(user_id, conversation_id, *changes):
+    """
+    Appends (kind, op, message_id) changes for one conversation to the feed.
+    Call inside the transaction that performs the write.
+
+    Every user-visible write passes through here, so this is also where the
+    user is pinned to the primary database for read-your-writes.
+    """
+    pin_to_primary(user_id)
+    with transaction.atomic():
+        ChatSyncCursor.objects.get_or_create(user_id=user_id)
+        # Held until the enclosing transaction commits: the next writer for
+        # this user numbers its changes after ours and commits after us.
+        cursor = ChatSyncCursor.objects.select_for_update().get(user_id=user_id)
+        first = cursor.seq + 1
+        cursor.seq += len(changes)
+        cursor.save(update_fields=["seq"])
+        ChatChange.objects.bulk_create(
+            [
+                ChatChange(
+                    user_id=user_id,
+                    seq=seq,
+                    conversation_id=conversation_id,
+                    kind=kind,
+                    op=op,
+                    message_id=message_id,
+                )
+                for seq, (kind, op, message_id) in enumerate(changes, start=first)
+            ]
+        )
+
+
+def record_conversation(conversation, op=ChatChange.UPSERT):
+    record_changes(conversation.user_id, conversation.id, (ChatChange.CONVERSATION, op, None))
+
+
+def encode_token(seq):
+    return urlsafe_b64encode(f"{TOKEN_PREFIX}{seq}".encode("ascii")).decode("ascii")
+
+
+def decode_token(token):
+    """The seq in `token`, or None for a token from an older format."""
+    try:
+        raw = urlsafe_b64decode(token.encode("ascii")).decode("ascii")
+        if raw.startswith(STALE_TOKEN_PREFIXES):
+            return None
+        if not raw.startswith(TOKEN_PREFIX):
+            raise ValueError(raw)
+        return int(raw[len(TOKEN_PREFIX):])
+    except (ValueError, UnicodeError) as exc:
+        raise InvalidToken(token) from exc
+
+
+def changes_since(user, token=None, limit=MAX_CHANGES):
+    """
+    Returns what changed for `user` after `token`, or a full conversation
+    snapshot when there is no token, it is newer than the feed (e.g. after a
+    database reset) or older than what was pruned. Messages are never part of
+    a full snapshot; clients page through them per conversation.
+    """
+    since = decode_token(token) if token else None
+    cursor = ChatSyncCursor.objects.filter(user=user).values("seq", "pruned_seq").first()
+    latest, pruned = (cursor["seq"], cursor["pruned_seq"]) if cursor else (0, 0)
+    if since is None or since > latest or since < pruned:
+        return full_snapshot(user, latest)
+
+    rows = list(
+        ChatChange.objects.filter(user=user, seq__gt=since)
+        .order_by("seq")
+        .values_list("seq", "kind", "op", "conversation_id", "message_id")[: limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Last op wins per object; upserts are resolved against current rows below.
+    conversation_ops, message_ops, cleared = {}, {}, set()
+    for _, kind, op, conversation_id, message_id in rows:
+        if kind == ChatChange.MESSAGE:
+            message_ops[message_id] = op
+        elif op == ChatChange.CLEAR:
+            cleared.add(conversation_id)
+        else:
+            conversation_ops[conversation_id] = op
+
+    conversations = list(
+        Conversation.objects.filter(
+            user=user,
+            is_active=True,
+            id__in=[pk for pk, op in conversation_ops.items() if op == ChatChange.UPSERT],
+        ).defer("summary")
+    )
+    messages = list(
+        Message.objects.filter(
+            conversation__user=user,
+            id__in=[pk for pk, op in message_ops.items() if op == ChatChange.UPSERT],
+        )
+        .exclude(conversation__cleared_until_id__gte=F("id"))
+        .order_by("created_at", "id")
+    )
+    # Anything touched that no longer exists was deleted later on.
+    found_conversations = {c.id for c in conversations}
+    found_messages = {m.id for m in messages}
+
+    return SyncResult(
+        token=encode_token(rows[-1][0] if rows else since),
+        has_more=has_more,
+        conversations=conversations,
+        messages=messages,
+        deleted_conversations=sorted(set(conversation_ops) - found_conversations),
+        deleted_messages=sorted(set(message_ops) - found_messages),
+        cleared_conversations=sorted(cleared),
+    )
+
+
+def full_snapshot(user, latest):
+    # The token is taken before the read, so a concurrent write is replayed
+    # by the next sync rather than lost.
+    return SyncResult(
+        token=encode_token(latest),
+        full=True,
+        conversations=list(Conversation.objects.filter(user=user, is_active=True).defer("summary")),
+    )
+
+
+def prune_changes(older_than, batch_size=None):
+    """
+    Deletes changes created before `older_than`. Each user's pruned_seq is
+    raised first, so a token pointing into the deleted range is answered
+    with a full snapshot rather than a delta with holes. Returns the rows
+    deleted.
+    """
+    batch_size = batch_size or settings.CHAT_DELETE_BATCH_SIZE
+    horizons = (
+        ChatChange.objects.filter(created_at__lt=older_than)
+        .values("user_id")
+        .annotate(last=Max("seq"))
+        .values_list("user_id", "last")
+    )
+    deleted = 0
+    for user_id, last in horizons:
+        ChatSyncCursor.objects.filter(user_id=user_id, pruned_seq__lt=last).update(pruned_seq=last)
+        rows = ChatChange.objects.filter(user_id=user_id, seq__lte=last)
+        while ids := list(rows.values_list("id", flat=True)[:batch_size]):
+            deleted += ChatChange.objects.filter(id__in=ids).delete()[0]
+    return deleted
@@ -10,3 +10,7 @@ class ProfilesConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.profiles"
+
+    def ready(self):
+        """Register signal handlers."""
+        from apps.profiles import signals  # noqa: F401
@@ -1,8 +1,14 @@
 """Service layer for user and profile management."""
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import caches
 from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
 
 from apps.profiles.models import UserProfile
 
@@ -40,3 +46,74 @@ def get_tokens_for_user(user):
         "access": str(refresh.access_token),
         "refresh": str(refresh),
     }
+
+
+USER_CACHE_PREFIX = "auth-user"
+
+
+def get_user_for_token(validated_token):
+    """
+    Resolves the user of a validated access token, applying the same checks
+    as simplejwt's JWTAuthentication.get_user but reading the user from
+    the short-lived cache. Shared by the HTTP and WebSocket auth paths.
+    """
+    try:
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError as e:
+        raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    user = get_cached_user(user_id)
+    if user is None:
+        raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+    if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+    if api_settings.CHECK_REVOKE_TOKEN:
+        if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+
+    return user
+
+
+def get_cached_user(user_id):
+    """
+    Returns the user with `user_id`, or None if it does not exist.
+
+    Entries are stamped with the user's cache version; invalidation bumps the
+    version, so an entry written by a request that raced a save is never read.
+    """
+    cache = caches[settings.AUTH_USER_CACHE_ALIAS]
+    user_key, version_key = _user_cache_keys(user_id)
+    cached = cache.get_many([user_key, version_key])
+    version = cached.get(version_key, 0)
+    entry = cached.get(user_key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    try:
+        user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+    except (User.DoesNotExist, ValueError, TypeError):
+        return None
+    cache.set(user_key, (version, user), settings.AUTH_USER_CACHE_TTL)
+    return user
+
+
+def invalidate_cached_user(user_id):
+    """
+    Drops the cached user. Called on user save and delete (see signals);
+    queryset.update() bypasses signals and must call this directly.
+    """
+    cache = caches[settings.AUTH_USER_CACHE_ALIAS]
+    user_key, version_key = _user_cache_keys(user_id)
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.set(version_key, 1, None)
+    cache.delete(user_key)
+
+
+def _user_cache_keys(user_id):
+    return f"{USER_CACHE_PREFIX}:{user_id}", f"{USER_CACHE_PREFIX}-version:{user_id}"
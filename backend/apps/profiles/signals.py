@@ -0,0 +1,19 @@
+"""Signal handlers for the profiles application."""
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.profiles.services import invalidate_cached_user
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """
+    Evicts the cached auth user after any save (profile edits, password
+    changes, deactivation, last_login) or delete. Runs after commit so a
+    concurrent request cannot re-cache the pre-save row.
+    """
+    transaction.on_commit(lambda: invalidate_cached_user(instance.pk))
@@ -0,0 +1,47 @@
+"""
+Conditional GET helpers for the API.
+
+Views build an ETag from a few cheap version fields (timestamps, counters)
+instead of hashing the rendered body, so a matching `If-None-Match` or
+`If-Modified-Since` is answered with 304 before anything is serialized.
+"""
+
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """A strong ETag over the given version fields."""
+    raw = "|".join(str(part) for part in parts)
+    return '"%s"' % hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    Returns a 304 response when the client's cached copy is still current (or
+    412 for a failed `If-Match`), otherwise None. `If-None-Match` takes
+    precedence over `If-Modified-Since`.
+    """
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    """
+    Attaches ETag/Last-Modified and makes clients revalidate on every use.
+    Responses are per user, so they must not be shared between users.
+    """
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ("Authorization", "Cookie"))
+    return response
@@ -0,0 +1,76 @@
+"""
+Primary/replica database routing.
+
+Writes always go to "default". Reads go to "replica" only while a request
+has opted in (see core.mixins.ReplicaReadMixin) and a replica is configured,
+so code that never opts in keeps reading the primary.
+
+Read-your-writes: every user-visible write pins its user to the primary for
+REPLICA_PIN_SECONDS, longer than the expected replication lag. The pin lives
+in the REPLICA_PIN_CACHE_ALIAS cache, which must be shared between processes
+when more than one serves the same users.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+REPLICA_ALIAS = "replica"
+PIN_CACHE_PREFIX = "db-pin"
+
+_use_replica = ContextVar("use_replica", default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def read_from_replica(enabled=True):
+    """Routes reads inside the block to the replica, if one is configured."""
+    token = _use_replica.set(enabled and replica_configured())
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def route_reads_to_replica():
+    """
+    Switches the current context to the replica until the enclosing
+    read_from_replica() block exits.
+    """
+    _use_replica.set(replica_configured())
+
+
+def pin_to_primary(user_id):
+    """Keeps the user's reads on the primary for the next REPLICA_PIN_SECONDS."""
+    if replica_configured():
+        _pin_cache().set(f"{PIN_CACHE_PREFIX}:{user_id}", True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(user_id):
+    return _pin_cache().get(f"{PIN_CACHE_PREFIX}:{user_id}", False)
+
+
+def _pin_cache():
+    return caches[settings.REPLICA_PIN_CACHE_ALIAS]
+
+
+class ReplicaRouter:
+    """Database router installed through DATABASE_ROUTERS."""
+
+    def db_for_read(self, model, **hints):
+        return REPLICA_ALIAS if _use_replica.get() else "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
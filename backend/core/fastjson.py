@@ -0,0 +1,55 @@
+"""
+JSON codec used by the API renderer/parser and the chat websocket.
+
+Uses orjson when it is installed and falls back to the stdlib `json` module
+with DRF's encoder otherwise. Both paths produce compact UTF-8 output and
+accept the same types (dates, decimals, UUIDs, lazy strings).
+"""
+
+import json
+
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+BACKEND = "orjson" if orjson else "json"
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Types orjson cannot serialize natively (Decimal, lazy strings, querysets...)
+    return _encoder.default(obj)
+
+
+if orjson:
+    # Dates go through DRF's encoder so both backends format them identically.
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(obj):
+        """Serializes `obj` to UTF-8 encoded JSON bytes."""
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+    def loads(data):
+        """Parses JSON from bytes or str. Raises ValueError on invalid input."""
+        return orjson.loads(data)
+
+else:
+
+    def dumps(obj):
+        """Serializes `obj` to UTF-8 encoded JSON bytes."""
+        return json.dumps(
+            obj, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    def loads(data):
+        """Parses JSON from bytes or str. Raises ValueError on invalid input."""
+        return json.loads(data)
+
+
+def dumps_str(obj):
+    """Serializes `obj` to a JSON string, e.g. for websocket text frames."""
+    return dumps(obj).decode("utf-8")
@@ -0,0 +1,83 @@
+"""
+Compares DRF's stock JSON renderer/parser with the core.fastjson ones on a
+large serialized message list:
+
+    python manage.py bench_json --messages 5000 --rounds 20
+"""
+
+import io
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from apps.chat.models import Message
+from apps.chat.serializers import MessageSerializer
+from core import fastjson
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+SAMPLE_REPLY = (
+    "Oh, wonderful, another existential crisis before lunch. "
+    "Have you tried drinking water and going outside? Revolutionary, I know. "
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmarks JSON rendering and parsing of a large message list."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=2000, help="Messages per payload")
+        parser.add_argument("--rounds", type=int, default=20, help="Timed rounds per case")
+
+    def handle(self, *args, **options):
+        payload = self.build_payload(options["messages"])
+        rounds = options["rounds"]
+        body = JSONRenderer().render(payload)
+
+        self.stdout.write(
+            f"fastjson backend: {fastjson.BACKEND}; payload: {options['messages']} messages, {len(body) / 1024:.0f} KiB"
+        )
+        cases = [
+            ("render", lambda: JSONRenderer().render(payload), lambda: FastJSONRenderer().render(payload)),
+            (
+                "parse",
+                lambda: JSONParser().parse(io.BytesIO(body)),
+                lambda: FastJSONParser().parse(io.BytesIO(body)),
+            ),
+        ]
+        for name, baseline, candidate in cases:
+            stock_ms = self.time_ms(baseline, rounds)
+            fast_ms = self.time_ms(candidate, rounds)
+            self.stdout.write(
+                f"{name:<7} drf {stock_ms:8.2f} ms   fast {fast_ms:8.2f} ms   x{stock_ms / fast_ms:.1f}"
+            )
+
+    @staticmethod
+    def build_payload(count):
+        # Unsaved rows run through the real serializer, so no database is needed.
+        now = timezone.now()
+        rows = [
+            Message(
+                id=i,
+                role="user" if i % 2 else "assistant",
+                content=SAMPLE_REPLY * (1 + i % 4),
+                created_at=now - timedelta(seconds=count - i),
+            )
+            for i in range(1, count + 1)
+        ]
+        data = MessageSerializer(rows, many=True).data
+        return {"success": True, "message": "List retrieved", "data": data, "meta": {"has_older": True}}
+
+    @staticmethod
+    def time_ms(fn, rounds):
+        fn()  # warm-up
+        best = float("inf")
+        for _ in range(rounds):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        return best * 1000
@@ -0,0 +1,151 @@
+"""
+Lightweight in-process metrics: labelled counters, gauges and histograms.
+
+Metrics are registered once by name and are safe to update from threads and
+coroutines. `snapshot()` returns everything recorded so far in this process.
+"""
+
+import threading
+from bisect import bisect_left
+
+# Millisecond buckets suited to LLM latencies.
+DEFAULT_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Counter:
+    """Monotonically increasing count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name, description=""):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {"labels": dict(key), "value": value}
+                for key, value in self._values.items()
+            ]
+
+
+class Gauge:
+    """Current value per label set, free to go up and down."""
+
+    kind = "gauge"
+
+    def __init__(self, name, description=""):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {"labels": dict(key), "value": value}
+                for key, value in self._values.items()
+            ]
+
+
+class Histogram:
+    """Bucketed distribution of observed values per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, description="", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+                self._series[key] = series
+            series["counts"][bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {
+                    "labels": dict(key),
+                    "buckets": dict(
+                        zip([*map(str, self.buckets), "+Inf"], series["counts"])
+                    ),
+                    "sum": round(series["sum"], 3),
+                    "count": series["count"],
+                }
+                for key, series in self._series.items()
+            ]
+
+
+def _register(cls, name, *args, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = cls(name, *args, **kwargs)
+            _registry[name] = metric
+        return metric
+
+
+def counter(name, description=""):
+    """Returns the counter registered under `name`, creating it if needed."""
+    return _register(Counter, name, description)
+
+
+def gauge(name, description=""):
+    """Returns the gauge registered under `name`, creating it if needed."""
+    return _register(Gauge, name, description)
+
+
+def histogram(name, description="", buckets=DEFAULT_BUCKETS):
+    """Returns the histogram registered under `name`, creating it if needed."""
+    return _register(Histogram, name, description, buckets)
+
+
+def snapshot():
+    """All metrics recorded in this process, keyed by name."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return {
+        metric.name: {
+            "type": metric.kind,
+            "description": metric.description,
+            "series": metric.snapshot(),
+        }
+        for metric in metrics
+    }
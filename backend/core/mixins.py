@@ -0,0 +1,26 @@
+"""Reusable view mixins for the API."""
+
+from core.db_router import is_pinned_to_primary, read_from_replica, route_reads_to_replica
+
+
+class ReplicaReadMixin:
+    """
+    Serves the actions in `replica_actions` from the read replica, unless
+    the user wrote recently and is pinned to the primary (read-your-writes).
+    """
+
+    replica_actions = ("list", "retrieve")
+
+    def dispatch(self, request, *args, **kwargs):
+        # Scopes the routing flag to this request; initial() switches it on
+        # once the action and the user are known.
+        with read_from_replica(enabled=False):
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action not in self.replica_actions:
+            return
+        if request.user.is_authenticated and is_pinned_to_primary(request.user.pk):
+            return
+        route_reads_to_replica()
@@ -1,6 +1,11 @@
 """Standard pagination configuration for the API."""
 
-from rest_framework.pagination import PageNumberPagination
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
 
 
@@ -27,3 +32,81 @@ class StandardPagination(PageNumberPagination):
                 },
             }
         )
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination on (created_at, id) that stays constant-time however
+    deep the client scrolls. Without a cursor the newest `page_size` rows are
+    returned; `before` pages towards older rows and `after` towards newer ones.
+    Each page is ordered oldest first and wrapped in the unified envelope.
+    """
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        limit = self.get_page_size(request)
+        before = self.decode_cursor(request.query_params.get("before"))
+        after = self.decode_cursor(request.query_params.get("after"))
+
+        if after:
+            created_at, pk = after
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            ).order_by("created_at", "id")
+            rows = list(queryset[: limit + 1])
+            self.has_newer, self.has_older = len(rows) > limit, True
+            rows = rows[:limit]
+        else:
+            queryset = queryset.order_by("-created_at", "-id")
+            if before:
+                created_at, pk = before
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+                )
+            rows = list(queryset[: limit + 1])
+            self.has_older, self.has_newer = len(rows) > limit, bool(before)
+            rows = rows[:limit][::-1]
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        first, last = (self.page[0], self.page[-1]) if self.page else (None, None)
+        return Response(
+            {
+                "success": True,
+                "message": "List retrieved",
+                "data": data,
+                "meta": {
+                    "before": self.encode_cursor(first) if self.has_older else None,
+                    "after": self.encode_cursor(last) if last else None,
+                    "has_older": self.has_older,
+                    "has_newer": self.has_newer,
+                },
+            }
+        )
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    @staticmethod
+    def encode_cursor(row):
+        raw = f"{row.created_at.isoformat()}|{row.id}"
+        return urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor):
+        if not cursor:
+            return None
+        try:
+            created_at, pk = urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+            return datetime.fromisoformat(created_at), int(pk)
+        except (ValueError, UnicodeError) as exc:
+            raise NotFound("Invalid cursor") from exc
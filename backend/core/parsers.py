@@ -0,0 +1,23 @@
+"""Parsers for the API."""
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from core import fastjson
+from core.renderers import FastJSONRenderer
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser backed by core.fastjson for UTF-8 request bodies."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        if encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return fastjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -0,0 +1,27 @@
+"""Renderers for the API."""
+
+from rest_framework.renderers import JSONRenderer
+
+from core import fastjson
+
+# U+2028/U+2029 are escaped like DRF does, so output stays a strict JS subset.
+_LINE_SEPARATORS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by core.fastjson. Indented output (e.g. for the
+    browsable API or `; indent=` requests) falls back to the stdlib path.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = fastjson.dumps(data)
+        for raw, escaped in _LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
@@ -0,0 +1,104 @@
+"""
+Failure handling for calls to remote services: jittered exponential backoff
+and a circuit breaker.
+
+A breaker opens after `failure_threshold` consecutive failures and fails fast
+with CircuitOpen for `reset_timeout` seconds. It then lets a single probe
+call through (half-open): success closes it, failure opens it again. Each
+breaker's state is published as the `circuit_state` gauge
+(0 closed, 1 half-open, 2 open).
+"""
+
+import random
+import threading
+import time
+
+from core import metrics
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+circuit_state = metrics.gauge("circuit_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open")
+circuit_transitions = metrics.counter("circuit_transitions_total", "Circuit breaker state changes")
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a service whose breaker is open."""
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"Circuit {name} is open; retrying in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def backoff_delay(attempt, base, cap):
+    """Full-jitter delay before retry number `attempt` (0-based), in seconds."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = None
+        circuit_state.set(STATE_VALUES[CLOSED], circuit=name)
+
+    @property
+    def state(self):
+        return self._state
+
+    def before_call(self):
+        """Raises CircuitOpen unless a call may go through now."""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN:
+                retry_in = self._opened_at + self.reset_timeout - now
+                if retry_in > 0:
+                    raise CircuitOpen(self.name, retry_in)
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                # One probe at a time; a probe that never reported back (e.g. a
+                # cancelled caller) is given up on after reset_timeout.
+                if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+                    raise CircuitOpen(self.name, self.reset_timeout)
+                self._probe_started = now
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probe_started = None
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_started = None
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                if self._state != OPEN:
+                    self._transition(OPEN)
+
+    def _transition(self, state):
+        # Called with the lock held.
+        self._state = state
+        circuit_state.set(STATE_VALUES[state], circuit=self.name)
+        circuit_transitions.inc(circuit=self.name, state=state)
+
+
+def circuit_breaker(name, failure_threshold, reset_timeout):
+    """Returns the breaker registered under `name`, creating it if needed."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+            _breakers[name] = breaker
+        return breaker
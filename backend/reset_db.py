@@ -2,10 +2,12 @@ import os
 import sys
 import shutil
 from pathlib import Path
+from dotenv import load_dotenv
 
 # 1. Setup path and environment
 BASE_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(BASE_DIR))
+load_dotenv(BASE_DIR / '.env')  # DATABASE_URL picks the database to reset
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
 
 # 2. Django Setup
@@ -37,12 +39,22 @@ def clean_migrations():
     print("✓ Migration files cleaned")
 
 def drop_database():
-    """Drop the SQLite database file."""
-    db_path = BASE_DIR / 'db.sqlite3'
+    """Drop the configured database: the SQLite file (with its WAL files) or the Postgres schema."""
+    db = settings.DATABASES['default']
+    if db['ENGINE'] == 'django.db.backends.postgresql':
+        drop_postgres_schema()
+        return
+
+    db_path = Path(db['NAME'])
     if db_path.exists():
         print(f"Dropping database {db_path}...")
         try:
             os.remove(db_path)
+            # WAL mode keeps uncheckpointed pages next to the database
+            for suffix in ('-wal', '-shm'):
+                sidecar = Path(f"{db_path}{suffix}")
+                if sidecar.exists():
+                    os.remove(sidecar)
             print("✓ Database dropped")
         except Exception as e:
             print(f"Error dropping database: {e}")
@@ -50,6 +62,19 @@ def drop_database():
     else:
         print("Database does not exist. Skipping drop.")
 
+def drop_postgres_schema():
+    """Drop and recreate the public schema of the Postgres database."""
+    django.setup()
+    print(f"Dropping schema public in {settings.DATABASES['default']['NAME']}...")
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("DROP SCHEMA public CASCADE")
+            cursor.execute("CREATE SCHEMA public")
+        print("✓ Database dropped")
+    except Exception as e:
+        print(f"Error dropping database: {e}")
+        sys.exit(1)
+
 def create_tables():
     """Create all database tables from Django models."""
     print("Creating database tables...")
@@ -85,6 +110,21 @@ def create_superuser():
     except Exception as e:
         print(f"✗ Error creating superuser: {e}")
 
+def snapshot_sqlite_replica():
+    """Copy a fresh SQLite primary over the local SQLite replica, if one is configured."""
+    replica = settings.DATABASES.get('replica')
+    primary = settings.DATABASES['default']
+    if not replica or replica['ENGINE'] != primary['ENGINE'] or 'sqlite3' not in primary['ENGINE']:
+        return
+    print(f"\nCopying {primary['NAME']} to replica {replica['NAME']}...")
+    connection.close()
+    for suffix in ('-wal', '-shm'):
+        sidecar = Path(f"{replica['NAME']}{suffix}")
+        if sidecar.exists():
+            os.remove(sidecar)
+    shutil.copyfile(primary['NAME'], replica['NAME'])
+    print("✓ Replica snapshot created")
+
 def main():
     print("="*60)
     print("DATABASE RESET SCRIPT (NO MIGRATIONS)")
@@ -94,6 +134,7 @@ def main():
     drop_database()
     create_tables()
     create_superuser()
+    snapshot_sqlite_replica()
     
     print("\n" + "="*60)
     print("RESET COMPLETE")
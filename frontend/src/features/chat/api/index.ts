@@ -1,5 +1,5 @@
 import client from '@/api/client';
-import { AILog, Conversation, Message } from '../types';
+import { AILog, Conversation, MessagePage, SyncResult } from '../types';
 
 export const getAILogs = async (): Promise<AILog[]> => {
     const response = await client.get('/chat/logs/');
@@ -36,12 +36,40 @@ export const getConversations = async (): Promise<Conversation[]> => {
     return [];
 };
 
-export const getMessages = async (id: string): Promise<Message[]> => {
-    const response = await client.get(`/chat/conversations/${id}/messages/`);
-    if (response.data && response.data.data && Array.isArray(response.data.data)) {
-        return response.data.data;
-    }
-    return Array.isArray(response.data) ? response.data : [];
+export const getMessages = async (id: string, before?: string | null): Promise<MessagePage> => {
+    const response = await client.get(`/chat/conversations/${id}/messages/`, {
+        params: before ? { before } : undefined,
+    });
+    const data = response.data;
+    return {
+        messages: data && Array.isArray(data.data) ? data.data : [],
+        before: data?.meta?.before ?? null,
+    };
+};
+
+const toConversation = (conv: any): Conversation => ({
+    id: conv.id.toString(),
+    title: conv.title,
+    updated_at: conv.updated_at,
+    preview: conv.last_message?.content || 'Empty conversation'
+});
+
+// Changes since `since`, or the full conversation list when there is no token yet
+export const syncChanges = async (since: string | null): Promise<SyncResult> => {
+    const response = await client.get('/chat/sync/', {
+        params: since ? { since } : undefined,
+    });
+    const { data, meta } = response.data;
+    return {
+        conversations: data.conversations.map(toConversation),
+        messages: data.messages,
+        deletedConversations: data.deleted.conversations.map(String),
+        deletedMessages: data.deleted.messages.map(String),
+        clearedConversations: data.cleared.map(String),
+        token: meta.token,
+        full: meta.full,
+        hasMore: meta.has_more,
+    };
 };
 
 export const createOrGetNewConversation = async (): Promise<Conversation> => {
@@ -59,6 +87,7 @@ export const createOrGetNewConversation = async (): Promise<Conversation> => {
     };
 };
 
+// Hidden at once; the server removes the rows in the background
 export const deleteConversation = async (id: string): Promise<void> => {
-    await client.delete(`/chat/conversations/${id}/`);
+    await client.delete(`/chat/conversations/${id}/`, { params: { background: true } });
 };
@@ -18,6 +18,13 @@ function LogTableRow({ log }: { log: AILog }) {
                     <span className="inline-flex items-center px-2 py-0.5 rounded text-xs font-medium bg-primary/10 text-primary border border-primary/20 whitespace-nowrap">
                         {log.model_name}
                     </span>
+                    {log.latency_ms != null && (
+                        <div className="mt-1 text-[10px] text-muted-foreground whitespace-nowrap">
+                            {Math.round(log.latency_ms)} ms
+                            {log.ttft_ms != null && ` · TTFT ${Math.round(log.ttft_ms)} ms`}
+                            {log.tokens_used != null && ` · ${log.tokens_used} tok`}
+                        </div>
+                    )}
                 </td>
                 <td className="px-4 py-3 max-w-[250px] align-top" title={log.input_text}>
                     <div className="line-clamp-3 font-mono text-xs break-words">{log.input_text}</div>
@@ -4,14 +4,19 @@ import { Input } from '@/components/ui/input';
 import { Button } from '@/components/ui/button';
 import { ChatBubble } from '../components/ChatBubble';
 import { ConversationList } from '../components/ConversationList';
-import { Message, Conversation } from '../types';
-import { getConversations, getMessages, deleteConversation, createOrGetNewConversation } from '../api';
+import { Message, Conversation, ProgressEvent } from '../types';
+import { syncChanges, getMessages, deleteConversation, createOrGetNewConversation } from '../api';
 import { Send, Loader2 } from 'lucide-react';
 
+const STREAMING_MESSAGE_ID = 'streaming';
+
 export default function ChatPage() {
     const [messages, setMessages] = useState<Message[]>([]);
     const [input, setInput] = useState('');
     const [thinkingStep, setThinkingStep] = useState<string | null>(null);
+    const [isStreaming, setIsStreaming] = useState(false);
+    const [olderCursor, setOlderCursor] = useState<string | null>(null);
+    const [isLoadingOlder, setIsLoadingOlder] = useState(false);
     const [isConnected, setIsConnected] = useState(false);
 
     // Conversation State
@@ -19,6 +24,14 @@ export default function ChatPage() {
     const [activeConversationId, setActiveConversationId] = useState<string | null>(null);
 
     const socketRef = useRef<WebSocket | null>(null);
+    // Mirrors activeConversationId for the socket handlers
+    const activeIdRef = useRef<string | null>(null);
+    // Ref sent with the first message of a chat that has no conversation yet
+    const draftRefRef = useRef<string | null>(null);
+    // Last frame seq and its epoch seen per conversation, sent back when resuming
+    const lastSeqRef = useRef(new Map<string, number>());
+    const epochRef = useRef(new Map<string, number | null>());
+    const syncTokenRef = useRef<string | null>(null);
     const scrollRef = useRef<HTMLDivElement>(null);
 
     // Initial load
@@ -26,92 +39,218 @@ export default function ChatPage() {
         loadConversations();
     }, []);
 
+    // Fetches the full list once, then only what changed since the last sync token
     const loadConversations = async () => {
         try {
-            const data = await getConversations();
-            setConversations(data);
+            let result;
+            do {
+                result = await syncChanges(syncTokenRef.current);
+                const { full, conversations: changed, deletedConversations } = result;
+                setConversations(prev => {
+                    if (full) return changed;
+                    const changedIds = new Set(changed.map(c => c.id));
+                    const kept = prev.filter(c => !changedIds.has(c.id) && !deletedConversations.includes(c.id));
+                    return [...changed, ...kept].sort((a, b) => b.updated_at.localeCompare(a.updated_at));
+                });
+                syncTokenRef.current = result.token;
+            } while (result.hasMore);
         } catch (error) {
             console.error("Failed to load conversations", error);
         }
     };
 
+    // Map backend messages to frontend format if needed
+    // Backend sends: { id, role, content, created_at }
+    // Frontend expects: { id, content, variant: 'user'|'assistant', timestamp }
+    const toChatMessages = (msgs: Message[]): Message[] => msgs.map(m => ({
+        id: m.id || Date.now().toString(),
+        content: m.content,
+        variant: m.role || (m.variant as any), // Handle both if type confusion
+        timestamp: m.created_at ? new Date(m.created_at) : new Date()
+    }));
+
     const loadMessages = async (id: string) => {
         try {
-            const msgs = await getMessages(id);
-            // Map backend messages to frontend format if needed
-            // Backend sends: { id, role, content, created_at }
-            // Frontend expects: { id, content, variant: 'user'|'assistant', timestamp }
-            setMessages(msgs.map(m => ({
-                id: m.id || Date.now().toString(),
-                content: m.content,
-                variant: m.role || (m.variant as any), // Handle both if type confusion
-                timestamp: m.created_at ? new Date(m.created_at) : new Date()
-            })));
+            const page = await getMessages(id);
+            setMessages(toChatMessages(page.messages));
+            setOlderCursor(page.before);
         } catch (error) {
             console.error("Failed to load messages", error);
         }
     };
 
-    // WebSocket Connection Management
+    const loadOlderMessages = async () => {
+        if (!activeConversationId || !olderCursor) return;
+        setIsLoadingOlder(true);
+        try {
+            const page = await getMessages(activeConversationId, olderCursor);
+            setMessages(prev => [...toChatMessages(page.messages), ...prev]);
+            setOlderCursor(page.before);
+        } catch (error) {
+            console.error("Failed to load earlier messages", error);
+        } finally {
+            setIsLoadingOlder(false);
+        }
+    };
+
+    // One socket serves every conversation; frames say which one they belong to
     useEffect(() => {
-        // Connect to WebSocket with current activeConversationId
-        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-        const token = localStorage.getItem('access');
-        let wsUrl = `${protocol}//${window.location.hostname}:8282/ws/chat/?token=${token}`;
+        let socket: WebSocket;
+        let reconnectTimer: ReturnType<typeof setTimeout>;
+        let closed = false;
 
-        if (activeConversationId) {
-            wsUrl += `&conversation_id=${activeConversationId}`;
-        }
+        const connect = () => {
+            const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+            const token = localStorage.getItem('access');
+            const wsUrl = `${protocol}//${window.location.hostname}:8282/ws/chat/?token=${token}`;
 
-        try {
             console.log(`Connecting to WS: ${wsUrl}`);
-            const socket = new WebSocket(wsUrl);
+            socket = new WebSocket(wsUrl);
             socketRef.current = socket;
 
             socket.onopen = () => {
                 console.log('Connected to Chat WS');
                 setIsConnected(true);
+                // Replay only what was missed; without a seq, refetch
+                const activeId = activeIdRef.current;
+                if (activeId) {
+                    const lastSeq = lastSeqRef.current.get(activeId);
+                    socket.send(JSON.stringify({
+                        type: 'resume',
+                        conversation_id: activeId,
+                        last_seq: lastSeq ?? null,
+                        epoch: epochRef.current.get(activeId) ?? null
+                    }));
+                    if (lastSeq === undefined) loadMessages(activeId);
+                }
+                // Catch up on anything changed while disconnected
+                if (syncTokenRef.current) loadConversations();
             };
 
             socket.onmessage = (event) => {
                 const data = JSON.parse(event.data);
 
-                if (data.type === 'thinking') {
-                    setThinkingStep(data.step);
+                if (data.type === 'conversation_started') {
+                    // The draft being typed into got its conversation
+                    if (data.ref && data.ref === draftRefRef.current) {
+                        draftRefRef.current = null;
+                        selectConversation(data.conversation_id);
+                    }
+                    loadConversations();
+                    return;
+                }
+
+                if (data.conversation_id && data.seq !== undefined) {
+                    // A new epoch means the server's counter was reset; old seqs no longer compare
+                    if (data.epoch !== epochRef.current.get(data.conversation_id)) {
+                        epochRef.current.set(data.conversation_id, data.epoch);
+                        lastSeqRef.current.delete(data.conversation_id);
+                    }
+                    const lastSeq = lastSeqRef.current.get(data.conversation_id) ?? 0;
+                    if (data.type === 'resumed' || data.type === 'resync_required') {
+                        // The server's count wins, even when it is behind ours
+                        lastSeqRef.current.set(data.conversation_id, data.seq);
+                    } else if (data.seq <= lastSeq) {
+                        return; // Already seen, live and replayed frames overlap on resume
+                    } else {
+                        lastSeqRef.current.set(data.conversation_id, data.seq);
+                    }
+                }
+
+                // Replies for other conversations only refresh the sidebar
+                const isActive = data.conversation_id
+                    ? data.conversation_id === activeIdRef.current
+                    : data.ref === draftRefRef.current;
+                if (!isActive) {
+                    if (data.type === 'message') loadConversations();
+                    return;
+                }
+
+                if (data.type === 'progress') {
+                    const event = data as ProgressEvent;
+                    const place = event.position ? ` · #${event.position} in line` : '';
+                    setThinkingStep(`${event.label}${place} · ${Math.round(event.elapsed_ms)} ms`);
+                } else if (data.type === 'delta') {
+                    setThinkingStep(null);
+                    setIsStreaming(true);
+                    setMessages(prev => {
+                        const last = prev[prev.length - 1];
+                        if (last?.id === STREAMING_MESSAGE_ID) {
+                            return [...prev.slice(0, -1), { ...last, content: last.content + data.content }];
+                        }
+                        return [...prev, {
+                            id: STREAMING_MESSAGE_ID,
+                            content: data.content,
+                            variant: 'assistant',
+                            timestamp: new Date()
+                        }];
+                    });
                 } else if (data.type === 'message') {
                     setThinkingStep(null);
+                    setIsStreaming(false);
+                    setMessages(prev => [...prev.filter(m => m.id !== STREAMING_MESSAGE_ID), {
+                        id: Date.now().toString(),
+                        content: data.content,
+                        variant: 'assistant',
+                        timestamp: new Date()
+                    }]);
+                    loadConversations(); // Picks up the new title and preview
+                } else if (data.type === 'user_message') {
+                    // Sent from another tab or device on this conversation
                     setMessages(prev => [...prev, {
                         id: Date.now().toString(),
                         content: data.content,
+                        variant: 'user',
+                        timestamp: new Date()
+                    }]);
+                } else if (data.type === 'resync_required') {
+                    // Too far behind to replay
+                    setThinkingStep(null);
+                    setIsStreaming(false);
+                    loadMessages(data.conversation_id);
+                } else if (data.type === 'error') {
+                    // e.g. code 'overloaded' when the server is shedding load
+                    setThinkingStep(null);
+                    setIsStreaming(false);
+                    console.error(data.message);
+                    setMessages(prev => [...prev.filter(m => m.id !== STREAMING_MESSAGE_ID), {
+                        id: Date.now().toString(),
+                        content: data.message,
                         variant: 'assistant',
                         timestamp: new Date()
                     }]);
-
-                    // If backend sends conversation_id, update local state
-                    if (data.conversation_id && !activeConversationId) {
-                        setActiveConversationId(data.conversation_id);
-                        loadConversations(); // Reload list to show new chat title
-                    }
-                } else if (data.type === 'conversation_started') {
-                    if (data.conversation_id && !activeConversationId) {
-                        setActiveConversationId(data.conversation_id);
-                        loadConversations();
-                    }
                 }
             };
 
             socket.onclose = () => {
                 console.log('Disconnected from Chat WS');
                 setIsConnected(false);
+                setIsStreaming(false);
+                if (!closed) reconnectTimer = setTimeout(connect, 1000);
             };
+        };
 
-            return () => {
-                socket.close();
-            };
-        } catch (err) {
-            console.error("WebSocket connection failed", err);
+        connect();
+        return () => {
+            closed = true;
+            clearTimeout(reconnectTimer);
+            socket.close();
+        };
+    }, []);
+
+    // Follow only the open conversation's broadcasts from other tabs
+    const selectConversation = (id: string | null) => {
+        const socket = socketRef.current;
+        if (socket?.readyState === WebSocket.OPEN && id !== activeIdRef.current) {
+            if (activeIdRef.current) {
+                socket.send(JSON.stringify({ type: 'unsubscribe', conversation_id: activeIdRef.current }));
+            }
+            // Messages come over REST; resuming without a seq just subscribes
+            if (id) socket.send(JSON.stringify({ type: 'resume', conversation_id: id, last_seq: null }));
         }
-    }, [activeConversationId]); // Reconnect when switching conversations
+        activeIdRef.current = id;
+        setActiveConversationId(id);
+    };
 
     // When active ID changes, load messages (if existing)
     useEffect(() => {
@@ -119,7 +258,9 @@ export default function ChatPage() {
             loadMessages(activeConversationId);
         } else {
             setMessages([]);
+            setOlderCursor(null);
             setThinkingStep(null);
+            setIsStreaming(false);
         }
     }, [activeConversationId]);
 
@@ -141,7 +282,14 @@ export default function ChatPage() {
         };
 
         setMessages(prev => [...prev, newMessage]);
-        socketRef.current.send(JSON.stringify({ message: input }));
+        const conversationId = activeIdRef.current;
+        if (!conversationId) draftRefRef.current = newMessage.id;
+        socketRef.current.send(JSON.stringify({
+            type: 'message',
+            conversation_id: conversationId,
+            ref: conversationId ? newMessage.id : draftRefRef.current,
+            message: input
+        }));
         setInput('');
     };
 
@@ -150,7 +298,7 @@ export default function ChatPage() {
         if (confirm('Delete this conversation details?')) {
             await deleteConversation(id);
             if (activeConversationId === id) {
-                setActiveConversationId(null);
+                selectConversation(null);
             }
             loadConversations();
         }
@@ -163,7 +311,7 @@ export default function ChatPage() {
                 const filtered = prev.filter(c => c.id !== newConv.id);
                 return [newConv, ...filtered];
             });
-            setActiveConversationId(newConv.id);
+            selectConversation(newConv.id);
         } catch (error) {
             console.error("Failed to start new conversation", error);
         }
@@ -175,7 +323,7 @@ export default function ChatPage() {
             <ConversationList
                 conversations={conversations}
                 activeId={activeConversationId}
-                onSelect={(id) => setActiveConversationId(id)}
+                onSelect={(id) => selectConversation(id)}
                 onDelete={handleDeleteConversation}
                 onNewChat={handleNewChat}
             />
@@ -209,6 +357,20 @@ export default function ChatPage() {
                             </div>
                         ) : (
                             <div className="space-y-6 pb-20">
+                                {olderCursor && (
+                                    <div className="flex justify-center">
+                                        <Button
+                                            variant="ghost"
+                                            size="sm"
+                                            onClick={loadOlderMessages}
+                                            disabled={isLoadingOlder}
+                                            className="text-xs text-muted-foreground"
+                                        >
+                                            {isLoadingOlder && <Loader2 className="mr-2 h-3 w-3 animate-spin" />}
+                                            Load earlier messages
+                                        </Button>
+                                    </div>
+                                )}
                                 {messages.map((msg) => (
                                     <ChatBubble key={msg.id} message={msg} />
                                 ))}
@@ -232,16 +394,16 @@ export default function ChatPage() {
                                 value={input}
                                 onChange={(e) => setInput(e.target.value)}
                                 placeholder="Tell me your latest 'issue'..."
-                                disabled={!!thinkingStep || !isConnected}
+                                disabled={!!thinkingStep || isStreaming || !isConnected}
                                 className="flex-1 bg-transparent border-none shadow-none focus-visible:ring-0 text-base h-12 placeholder:text-muted-foreground/50"
                             />
                             <Button
                                 type="submit"
                                 size="icon"
-                                disabled={!!thinkingStep || !isConnected || !input.trim()}
+                                disabled={!!thinkingStep || isStreaming || !isConnected || !input.trim()}
                                 className="h-10 w-10 shrink-0 bg-primary hover:bg-primary/90 text-primary-foreground shadow-lg transition-all rounded-full"
                             >
-                                {thinkingStep ? <Loader2 className="w-4 h-4 animate-spin" /> : <Send className="w-4 h-4" />}
+                                {thinkingStep || isStreaming ? <Loader2 className="w-4 h-4 animate-spin" /> : <Send className="w-4 h-4" />}
                                 <span className="sr-only">Send</span>
                             </Button>
                         </form>
@@ -7,6 +7,11 @@ export interface Message {
     created_at?: string; // Backend uses created_at
 }
 
+export interface MessagePage {
+    messages: Message[];
+    before: string | null; // Cursor for the next older page, null when fully loaded
+}
+
 export interface Conversation {
     id: string;
     title: string;
@@ -14,6 +19,17 @@ export interface Conversation {
     preview: string;
 }
 
+export interface SyncResult {
+    conversations: Conversation[];
+    messages: (Message & { conversation: number })[];
+    deletedConversations: string[];
+    deletedMessages: string[];
+    clearedConversations: string[];
+    token: string;
+    full: boolean; // Conversations are the complete list rather than a delta
+    hasMore: boolean;
+}
+
 export interface AILog {
     id: number;
     input_text: string;
@@ -22,8 +38,19 @@ export interface AILog {
     model_name: string;
     timestamp: string;
     tokens_used?: number;
+    prompt_tokens?: number | null;
+    completion_tokens?: number | null;
+    latency_ms?: number | null;
+    ttft_ms?: number | null;
 }
 
-export interface ThinkingStep {
-    step: string;
+export type ProgressStage = 'context_loaded' | 'prompt_built' | 'queued' | 'request_sent' | 'first_token' | 'persisted';
+
+export interface ProgressEvent {
+    stage: ProgressStage;
+    label: string;
+    elapsed_ms: number;
+    stage_ms: number;
+    conversation_id?: string | null;
+    position?: number; // Queue position while waiting for an LLM slot
 }